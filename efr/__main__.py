@@ -2,14 +2,30 @@ import argparse
 import importlib
 import logging
 import matplotlib.pyplot as plt
+import numpy as np
 import timeit
 
-from ult_analysis_bases import ult_analysis_bases
-from bc_chem_analysis import bc_chem_analysis
-from bc_ult_analysis import bc_ult_analysis
-from bc_ult_modified import bc_ult_modified
-from batch_reactor import batch_reactor
-from batch_sensitivity import batch_sensitivity
+from batch_reactor import sp_gases
+from batch_reactor import sp_liquids
+from batch_reactor import sp_metaplastics
+from batch_reactor import sp_solids
+from batch_sensitivity import evaluate_shard
+from batch_sensitivity import generate_shards
+from batch_sensitivity import merge_shards
+from emulator import train_emulator
+from feedstock_loader import load_feedstock
+from fitting import fit
+from golden import check_golden
+from golden import engines
+from golden import generate_golden
+from pipeline import run_pipeline
+from plotter import plot_lumped_spread
+from progress import settings as progress_settings
+from results import export_results
+from solver import check_solver
+from server import serve
+from trajectory_store import lumped_trajectories
+from uncertainty import propagate_uncertainty
 
 
 def _command_line_args():
@@ -27,9 +43,9 @@ def _command_line_args():
 
     parser.add_argument(
         '-bc', '--biocomp',
-        choices=['chem', 'ult', 'ultmod'],
+        choices=['chem', 'ult', 'ultmod', 'compare'],
         default='chem',
-        help='biomass composition method (default: chem)')
+        help='biomass composition method, compare runs every method (default: chem)')
 
     parser.add_argument(
         '-sp', '--show_plots',
@@ -41,6 +57,177 @@ def _command_line_args():
         action='store_true',
         help='sensitivity analysis of the kinetics (default: False)')
 
+    parser.add_argument(
+        '--feedstock-workbook',
+        metavar='PATH',
+        help='load the feedstock analyses from an .xlsx workbook (default: from params)')
+
+    parser.add_argument(
+        '--rtol',
+        type=float,
+        help='relative tolerance of the reactor integrator (default: from params)')
+
+    parser.add_argument(
+        '--atol',
+        type=float,
+        help='absolute tolerance of the reactor integrator (default: from params)')
+
+    parser.add_argument(
+        '--max-steps',
+        type=int,
+        help='maximum number of integrator steps (default: from params)')
+
+    parser.add_argument(
+        '--max-time-step',
+        type=float,
+        help='maximum integrator time step in seconds (default: from params)')
+
+    parser.add_argument(
+        '--output',
+        choices=['fixed', 'steps', 'adaptive'],
+        help='reactor states to record, fixed grid or integrator steps (default: from params)')
+
+    parser.add_argument(
+        '--temperature-profile',
+        metavar='PATH',
+        help='CSV file of time [s] and particle temperature [K] for the reactor (default: from params)')
+
+    parser.add_argument(
+        '--heating-rate',
+        type=float,
+        help='heat the particle from 298.15 K at this rate in K/s up to the reactor temperature '
+             '(default: from params)')
+
+    parser.add_argument(
+        '--progress-interval',
+        type=float,
+        default=10.0,
+        help='seconds between progress reports of long runs, 0 to turn off (default: 10)')
+
+    parser.add_argument(
+        '--status-file',
+        help='JSON file updated with the progress of long runs (default: None)')
+
+    parser.add_argument(
+        '--cache-dir',
+        default='.efr-cache',
+        help='directory for cached stage outputs (default: .efr-cache)')
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='rerun every stage instead of using cached outputs (default: False)')
+
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='show which stages would run or use cached outputs then exit (default: False)')
+
+    parser.add_argument(
+        '--export',
+        metavar='DIR',
+        help='append the batch reactor and sensitivity results to Parquet datasets in DIR (default: None)')
+
+    parser.add_argument(
+        '--export-trajectories',
+        action='store_true',
+        help='also export every recorded reactor state (default: False)')
+
+    parser.add_argument(
+        '--block-size',
+        type=int,
+        help='stream the sensitivity analysis in blocks of this many samples (default: from params)')
+
+    parser.add_argument(
+        '--save-trajectories',
+        metavar='PATH',
+        help='store the sensitivity analysis trajectories in a .npy file (default: from params)')
+
+    commands = parser.add_mutually_exclusive_group()
+
+    commands.add_argument(
+        '--sa-generate',
+        type=int,
+        metavar='N_SHARDS',
+        help='write sensitivity analysis samples as N shard files then exit')
+
+    commands.add_argument(
+        '--sa-evaluate',
+        metavar='SHARD',
+        help='evaluate one sensitivity analysis shard file then exit')
+
+    commands.add_argument(
+        '--sa-merge',
+        action='store_true',
+        help='merge evaluated shards and run the Sobol analysis then exit')
+
+    parser.add_argument(
+        '--shard-dir',
+        default='shards',
+        help='directory for sensitivity analysis shard files (default: shards)')
+
+    commands.add_argument(
+        '--plot-trajectories',
+        metavar='PATH',
+        help='plot the lumped yields of stored trajectories then exit')
+
+    commands.add_argument(
+        '--golden-generate',
+        metavar='PATH',
+        help='compute reference results for kinetics engines then exit')
+
+    commands.add_argument(
+        '--golden-check',
+        metavar='PATH',
+        help='check kinetics engines against reference results then exit')
+
+    parser.add_argument(
+        '--engine',
+        action='append',
+        choices=sorted(engines),
+        help='kinetics engine to check, can be repeated (default: all engines)')
+
+    commands.add_argument(
+        '--fit',
+        action='store_true',
+        help='fit the splitting parameters or kinetics to measured yields then exit')
+
+    parser.add_argument(
+        '--fit-output',
+        metavar='PATH',
+        help='JSON file for the fitted parameters (default: from params)')
+
+    commands.add_argument(
+        '--emulator-train',
+        metavar='PATH',
+        help='train the yield emulator from batch reactor runs and save it to PATH then exit')
+
+    commands.add_argument(
+        '--uncertainty',
+        action='store_true',
+        help='propagate the feedstock measurement uncertainty to the yields then exit')
+
+    commands.add_argument(
+        '--serve',
+        action='store_true',
+        help='run as a resident simulation service until interrupted')
+
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='address of the simulation service (default: 127.0.0.1)')
+
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8765,
+        help='port of the simulation service (default: 8765)')
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='number of worker processes (default: number of CPUs)')
+
     args = parser.parse_args()
     return args
 
@@ -67,23 +254,67 @@ def main():
     params = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(params)
 
-    # Ultimate analysis bases
-    ult_bases = ult_analysis_bases(params.feedstock)
+    # Feedstock analyses from a workbook replace those in the parameters file
+    if args.feedstock_workbook:
+        params.feedstock.update(load_feedstock(args.feedstock_workbook, name=params.feedstock['name']))
+
+    # Progress reports for runs with many samples
+    progress_settings['interval'] = args.progress_interval
+    progress_settings['status_file'] = args.status_file
+
+    # Integrator and output options from the command line override the parameters file
+    for key in ('rtol', 'atol', 'max_steps', 'max_time_step', 'output'):
+        if getattr(args, key) is not None:
+            params.reactor[key] = getattr(args, key)
+
+    check_solver(params.reactor)
+
+    # Temperature history of the particle
+    if args.temperature_profile:
+        tp = np.loadtxt(args.temperature_profile, delimiter=',', ndmin=2)
+        params.reactor['profile'] = {'type': 'table', 'time': tp[:, 0].tolist(), 'temperature': tp[:, 1].tolist()}
+    elif args.heating_rate:
+        params.reactor['profile'] = {'type': 'heating_rate', 'initial': 298.15, 'rate': args.heating_rate}
+
+    if args.block_size:
+        params.sensitivity_analysis['block_size'] = args.block_size
+
+    if args.save_trajectories:
+        params.sensitivity_analysis['trajectories'] = args.save_trajectories
 
-    # Biomass composition
-    if args.biocomp == 'chem':
-        bc = bc_chem_analysis(params.feedstock)
-    elif args.biocomp == 'ult':
-        bc = bc_ult_analysis(ult_bases)
-    elif args.biocomp == 'ultmod':
-        bc = bc_ult_modified(params.feedstock)
+    if args.fit_output:
+        params.fitting['output'] = args.fit_output
 
-    # Batch reactor yields for given biomass composition
-    batch_reactor(params.reactor, bc)
+    # Sharded sensitivity analysis and service commands run instead of the model
+    if args.sa_generate:
+        generate_shards(params.reactor, params.sensitivity_analysis, args.sa_generate, args.shard_dir)
+    elif args.sa_evaluate:
+        evaluate_shard(args.sa_evaluate)
+    elif args.sa_merge:
+        merge_shards(args.shard_dir)
+    elif args.plot_trajectories:
+        groups = {'gases': sp_gases, 'liquids': sp_liquids, 'solids': sp_solids + sp_metaplastics}
+        time, lumped = lumped_trajectories(args.plot_trajectories, groups)
+        plot_lumped_spread(time, lumped)
+    elif args.golden_generate:
+        generate_golden(
+            args.golden_generate, params.reactor, params.feedstock, params.sensitivity_analysis, params.golden)
+    elif args.golden_check:
+        check_golden(args.golden_check, params.golden, args.engine)
+    elif args.fit:
+        fit(params.feedstock, params.reactor, params.fitting, args.workers)
+    elif args.emulator_train:
+        train_emulator(args.emulator_train, params.reactor, params.emulator, args.workers)
+    elif args.uncertainty:
+        propagate_uncertainty(params.feedstock, params.reactor, params.uncertainty, args.workers)
+    elif args.serve:
+        serve(params.reactor, params.feedstock, args.host, args.port, args.workers)
+    else:
+        out = run_pipeline(args, params, args.cache_dir, not args.no_cache, args.dry_run)
 
-    # Sensitivity analysis of a batch reactor using Debiagi 2018 pyrolysis kinetics
-    if args.sensitivity_analysis:
-        batch_sensitivity(params.reactor, params.sensitivity_analysis)
+        if args.export and out:
+            runs = list(out['compare'].values()) if 'compare' in out else [out['batch']]
+            export_results(args.export, runs, out.get('sensitivity'), args.export_trajectories)
 
     # Elapsed time for the program
     tf = timeit.default_timer()
@@ -1,35 +1,59 @@
 import cantera as ct
 import logging
 import numpy as np
+import timeit
 
+from scipy.interpolate import PchipInterpolator
+
+from mechanism import load_gas
 from plotter import plot_gases_liquids
 from plotter import plot_solids_metaplastics
 from plotter import plot_phases_and_temp
 from plotter import plot_barh
+from profile_reactor import run_profile
+from results import BatchResult
+from solver import check_solver
+from solver import configure_solver
+from solver import solver_stats
+
+# species representing gases
+sp_gases = ('C2H4', 'C2H6', 'CH2O', 'CH4', 'CO', 'CO2', 'H2')
+
+# species representing liquids (tars)
+sp_liquids = (
+    'C2H3CHO', 'C2H5CHO', 'C2H5OH', 'C5H8O4', 'C6H10O5', 'C6H5OCH3', 'C6H5OH',
+    'C6H6O3', 'C24H28O4', 'CH2OHCH2CHO', 'CH2OHCHO', 'CH3CHO', 'CH3CO2H',
+    'CH3OH', 'CHOCHO', 'CRESOL', 'FURFURAL', 'H2O', 'HCOOH', 'MLINO', 'U2ME12',
+    'VANILLIN', 'ACQUA'
+)
+
+# species representing solids
+sp_solids = (
+    'CELL', 'CELLA', 'GMSW', 'HCE1', 'HCE2', 'ITANN', 'LIG', 'LIGC', 'LIGCC',
+    'LIGH', 'LIGO', 'LIGOH', 'TANN', 'TGL', 'CHAR'
+)
+
+# species representing metaplastics
+sp_metaplastics = (
+    'GCH2O', 'GCO2', 'GCO', 'GCH3OH', 'GCH4', 'GC2H4', 'GC6H5OH', 'GCOH2',
+    'GH2', 'GC2H6'
+)
 
 
-def batch_reactor(reactor, bc):
+def bc_to_y(bc):
     """
-    Batch reactor yields using Debiagi 2018 kinetics for softwood.
+    Biomass composition as mass fraction inputs to the batch reactor.
 
     Parameters
     ----------
-    reactor : dict
-        Reactor parameters.
     bc : dict
         Biomass composition.
-    """
 
-    # get reactor parameters
-    tmax = reactor['time_duration']
-    temp = reactor['temperature']
-    press = reactor['pressure']
-    energy = reactor['energy']
-
-    # get CTI file for Debiagi 2018 kinetics for softwood
-    cti_file = 'efr/debiagi_sw.cti'
-
-    # biomass composition as mass fraction inputs to batch reactor
+    Returns
+    -------
+    y_fracs : dict
+        Mass fractions of CELL, GMSW, LIGC, LIGH, LIGO, TANN, and TGL.
+    """
     y_fracs = {
         'CELL': bc['cellulose'],
         'GMSW': bc['hemicellulose'],
@@ -39,48 +63,317 @@ def batch_reactor(reactor, bc):
         'TANN': bc['tannins'],
         'TGL': bc['triglycerides']
     }
+    return y_fracs
+
+
+def time_grid(reactor):
+    """
+    Times at which the batch reactor states are recorded [s].
+
+    Parameters
+    ----------
+    reactor : dict
+        Reactor parameters.
+
+    Returns
+    -------
+    ndarray
+        Evenly spaced times from zero to the time duration.
+    """
+    return np.linspace(0, reactor['time_duration'], 100)
+
+
+def run_batch(y, reactor):
+    """
+    Integrate the batch reactor using Debiagi 2018 kinetics for softwood. The
+    mechanism is loaded once per process and reused between runs. If the
+    reactor parameters have a temperature `profile` the reactor follows that
+    temperature history instead of the energy equation. The output and
+    solver options are checked in either case, see `run_profile()`.
+
+    Parameters
+    ----------
+    y : dict
+        Initial mass fractions of the biomass species such as CELL, GMSW,
+        LIGC, LIGH, LIGO, TANN, and TGL.
+    reactor : dict
+        Reactor parameters.
+
+    Returns
+    -------
+    states : SolutionArray
+        Reactor states with the time `t` at each state.
+    stats : dict
+        Integrator statistics for the run.
+
+    Notes
+    -----
+    The integrator is stepped one step at a time so the steps can be
+    counted. The `output` reactor parameter sets which states are recorded.
+    The `fixed` output records the state at each time of `time_grid()`. The
+    `steps` output records every internal integrator step and the `adaptive`
+    output only records a step once a mass fraction has changed by at least
+    `output_tol` since the last recorded state. Both stepping outputs end
+    with the state at the time duration given by the integrator.
+    Use `interpolate_states()` to get the states at other times.
+    """
+
+    # get reactor parameters
+    tmax = reactor['time_duration']
+    temp = reactor['temperature']
+    press = reactor['pressure']
+    energy = reactor['energy']
+    output = reactor.get('output', 'fixed')
 
     # time vector to evaluate reaction rates [s]
-    time = np.linspace(0, tmax, 100)
+    time = time_grid(reactor)
+
+    if output not in ('fixed', 'steps', 'adaptive'):
+        raise ValueError(f'unknown output {output!r}, use fixed, steps, or adaptive')
 
-    # disable warnings about discontinuity at polynomial mid-point in thermo data
-    # comment this line to show the warnings
-    ct.suppress_thermo_warnings()
+    check_solver(reactor)
 
-    gas = ct.Solution(cti_file)
+    if reactor.get('profile'):
+        return run_profile(y, reactor, time)
 
-    gas.TPY = temp, press, y_fracs
+    gas = load_gas()
+
+    gas.TPY = temp, press, y
     r = ct.IdealGasReactor(gas, energy=energy)
 
     sim = ct.ReactorNet([r])
+    configure_solver(sim, reactor)
     states = ct.SolutionArray(gas, extra=['t'])
 
-    for tm in time:
-        sim.advance(tm)
-        states.append(r.thermo.state, t=tm)
+    ti = timeit.default_timer()
+    steps = 0
+    max_steps = reactor.get('max_steps') or np.inf
 
-    # species representing gases
-    sp_gases = ('C2H4', 'C2H6', 'CH2O', 'CH4', 'CO', 'CO2', 'H2')
+    def step():
+        # one integrator step, the step limit applies to the whole run
+        nonlocal steps
+        if steps >= max_steps:
+            raise ct.CanteraError(f'reached max_steps = {max_steps} before t = {tmax} s')
+        steps += 1
+        return sim.step()
 
-    # species representing liquids (tars)
-    sp_liquids = (
-        'C2H3CHO', 'C2H5CHO', 'C2H5OH', 'C5H8O4', 'C6H10O5', 'C6H5OCH3', 'C6H5OH',
-        'C6H6O3', 'C24H28O4', 'CH2OHCH2CHO', 'CH2OHCHO', 'CH3CHO', 'CH3CO2H',
-        'CH3OH', 'CHOCHO', 'CRESOL', 'FURFURAL', 'H2O', 'HCOOH', 'MLINO', 'U2ME12',
-        'VANILLIN', 'ACQUA'
-    )
+    if output == 'fixed':
+        # time reached by the integrator which can be past the last output
+        t_step = 0.0
 
-    # species representing solids
-    sp_solids = (
-        'CELL', 'CELLA', 'GMSW', 'HCE1', 'HCE2', 'ITANN', 'LIG', 'LIGC', 'LIGCC',
-        'LIGH', 'LIGO', 'LIGOH', 'TANN', 'TGL', 'CHAR'
-    )
+        for tm in time:
+            # step past the output time then get the state at the output time
+            # from the integrator interpolant within the last step
+            while t_step < tm:
+                t_step = step()
+            sim.advance(tm)
+            states.append(r.thermo.state, t=tm)
+    else:
+        tol = reactor.get('output_tol', 1e-3) if output == 'adaptive' else 0.0
+        states.append(r.thermo.state, t=0.0)
+        y_last = r.thermo.Y
 
-    # species representing metaplastics
-    sp_metaplastics = (
-        'GCH2O', 'GCO2', 'GCO', 'GCH3OH', 'GCH4', 'GC2H4', 'GC6H5OH', 'GCOH2',
-        'GH2', 'GC2H6'
-    )
+        while step() < tmax:
+            tpy = r.thermo.TPY
+            if np.abs(tpy[2] - y_last).max() >= tol:
+                states.append(TPY=tpy, t=sim.time)
+                y_last = tpy[2]
+
+        # state at the time duration from the integrator interpolant within
+        # the last step
+        sim.advance(tmax)
+        states.append(r.thermo.state, t=tmax)
+
+    stats = solver_stats(timeit.default_timer() - ti, steps)
+
+    return states, stats
+
+
+def lumped_yields(states):
+    """
+    Mass fractions of gases, liquids, and solids at each reactor state. The
+    metaplastics are lumped with the solids.
+
+    Parameters
+    ----------
+    states : SolutionArray
+        Reactor states.
+
+    Returns
+    -------
+    tuple of ndarray
+        Mass fractions of y_gases, y_liquids, and y_solids.
+    """
+    y_gases = states(*sp_gases).Y.sum(axis=1)
+    y_liquids = states(*sp_liquids).Y.sum(axis=1)
+    y_solids = states(*(sp_solids + sp_metaplastics)).Y.sum(axis=1)
+    return y_gases, y_liquids, y_solids
+
+
+def states_to_arrays(states):
+    """
+    Reactor states as a dictionary of arrays that can be pickled.
+
+    Parameters
+    ----------
+    states : SolutionArray
+        Reactor states with the time `t` at each state.
+
+    Returns
+    -------
+    dict
+        Time `t`, temperature `T`, pressure `P`, and species mass fractions
+        `Y` at each state.
+    """
+    return {'t': states.t, 'T': states.T, 'P': states.P, 'Y': states.Y}
+
+
+def batch_result(states, stats, reactor, bc=None):
+    """
+    Batch reactor result object from the reactor states.
+
+    Parameters
+    ----------
+    states : SolutionArray
+        Reactor states with the time `t` at each state.
+    stats : dict
+        Integrator statistics for the run.
+    reactor : dict
+        Reactor parameters.
+    bc : Composition, optional
+        Biomass composition of the run.
+
+    Returns
+    -------
+    BatchResult
+        Arrays of the reactor states with the species in each phase.
+    """
+    phases = {'gases': sp_gases, 'liquids': sp_liquids, 'solids': sp_solids, 'metaplastics': sp_metaplastics}
+    return BatchResult(
+        states.t, states.T, states.P, states.Y, tuple(states.species_names), phases, stats, reactor, bc)
+
+
+def arrays_to_states(arrays):
+    """
+    Reactor states from a dictionary of arrays made by `states_to_arrays()`.
+
+    Parameters
+    ----------
+    arrays : dict
+        Time, temperature, pressure, and mass fractions at each state.
+
+    Returns
+    -------
+    states : SolutionArray
+        Reactor states with the time `t` at each state.
+    """
+    states = ct.SolutionArray(load_gas(), len(arrays['t']), extra={'t': arrays['t']})
+    states.TPY = arrays['T'], arrays['P'], arrays['Y']
+    return states
+
+
+def interpolate_arrays(arrays, times):
+    """
+    Reactor state arrays at other times by monotone cubic (PCHIP)
+    interpolation between the recorded states.
+
+    Parameters
+    ----------
+    arrays : dict
+        Time, temperature, pressure, and mass fractions at each state as
+        returned by `states_to_arrays()`.
+    times : array_like
+        Times within the recorded time span [s].
+
+    Returns
+    -------
+    dict
+        Time `t`, temperature `T`, pressure `P`, and species mass fractions
+        `Y` at each of the times.
+    """
+    t = arrays['t']
+    times = np.asarray(times, dtype=float)
+
+    interp = {
+        't': times,
+        'T': PchipInterpolator(t, arrays['T'])(times),
+        'P': PchipInterpolator(t, arrays['P'])(times),
+        'Y': PchipInterpolator(t, arrays['Y'], axis=0)(times)
+    }
+
+    return interp
+
+
+def interpolate_states(states, times):
+    """
+    Reactor states at other times. See `interpolate_arrays()`.
+
+    Parameters
+    ----------
+    states : SolutionArray
+        Reactor states with the time `t` at each state.
+    times : array_like
+        Times within the recorded time span [s].
+
+    Returns
+    -------
+    SolutionArray
+        Reactor states at the times.
+    """
+    return arrays_to_states(interpolate_arrays(states_to_arrays(states), times))
+
+
+def plot_batch_reactor(states):
+    """
+    Plot the species, phases, and temperature of the batch reactor.
+
+    Parameters
+    ----------
+    states : SolutionArray
+        Reactor states with the time `t` at each state.
+    """
+
+    # sum of species mass fractions for gases, liquids, solids, metaplastics
+    y_gases = states(*sp_gases).Y.sum(axis=1)
+    y_liquids = states(*sp_liquids).Y.sum(axis=1)
+    y_solids = states(*sp_solids).Y.sum(axis=1)
+    y_metaplastics = states(*sp_metaplastics).Y.sum(axis=1)
+
+    plot_gases_liquids(states, sp_gases, sp_liquids)
+    plot_solids_metaplastics(states, sp_metaplastics)
+    plot_phases_and_temp(states, y_gases, y_liquids, y_solids, y_metaplastics)
+    plot_barh(states, sp_gases, sp_liquids, sp_solids, sp_metaplastics)
+
+
+def batch_reactor(reactor, bc, plot=True):
+    """
+    Batch reactor yields using Debiagi 2018 kinetics for softwood.
+
+    Parameters
+    ----------
+    reactor : dict
+        Reactor parameters.
+    bc : Composition
+        Biomass composition.
+    plot : bool, optional
+        Plot the results (default: True).
+
+    Returns
+    -------
+    BatchResult
+        Reactor states, integrator statistics, and composition of the run.
+    """
+
+    # get reactor parameters
+    tmax = reactor['time_duration']
+    temp = reactor['temperature']
+    press = reactor['pressure']
+    energy = reactor['energy']
+
+    # biomass composition as mass fraction inputs to batch reactor
+    y_fracs = bc_to_y(bc)
+
+    states, stats = run_batch(y_fracs, reactor)
 
     # sum of species mass fractions for gases, liquids, solids, metaplastics
     y_gases = states(*sp_gases).Y.sum(axis=1)
@@ -94,18 +387,21 @@ def batch_reactor(reactor, bc):
         f'pressure      = {press:,} Pa\n'
         f'temperature   = {temp} K ({temp - 273.15}°C)\n'
         f'time duration = {tmax} s\n'
-        f'energy        = {energy}\n\n'
+        f'energy        = {energy}\n'
+        f'output        = {reactor.get("output", "fixed")} ({len(states)} states)\n\n'
         f'              % mass\n'
         f'gases         {y_gases[-1] * 100:.2f}\n'
         f'liquids       {y_liquids[-1] * 100:.2f}\n'
         f'solids        {y_solids[-1] * 100:.2f}\n'
-        f'metaplastics  {y_metaplastics[-1] * 100:.2f}\n'
+        f'metaplastics  {y_metaplastics[-1] * 100:.2f}\n\n'
+        f'solver steps  = {stats["steps"]}\n'
+        f'solver time   = {stats["wall_time"]:.4f} s\n'
     )
 
     logging.info(results)
 
     # plot results
-    plot_gases_liquids(states, sp_gases, sp_liquids)
-    plot_solids_metaplastics(states, sp_metaplastics)
-    plot_phases_and_temp(states, y_gases, y_liquids, y_solids, y_metaplastics)
-    plot_barh(states, sp_gases, sp_liquids, sp_solids, sp_metaplastics)
+    if plot:
+        plot_batch_reactor(states)
+
+    return batch_result(states, stats, reactor, bc)
@@ -1,15 +1,40 @@
-import cantera as ct
+import glob
+import json
 import logging
 import numpy as np
+import os
 
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
 from SALib.sample import saltelli
 from SALib.analyze import sobol
 
+from batch_reactor import interpolate_arrays
+from batch_reactor import lumped_yields
+from batch_reactor import run_batch
+from batch_reactor import states_to_arrays
+from batch_reactor import time_grid
+from mechanism import cti_file
+from mechanism import load_gas
+from mechanism import mechanism_hash
 from plotter import plot_batch_effects
 from plotter import plot_sobol
-
-
-def _run_batch_reactor(y, reactor):
+from progress import Progress
+from results import SensitivityResult
+from shared_buffer import attach_buffer
+from shared_buffer import create_buffer
+from shared_buffer import release_buffer
+from solver import log_solver_summary
+from solver import stat_keys
+from solver import summarize_stats
+from streaming import SobolAccumulator
+from streaming import saltelli_blocks
+from trajectory_store import create_store
+from trajectory_store import open_store
+from workers import worker_pool
+
+
+def _run_batch_reactor(y, reactor, out=None):
     """
     Run batch reactor for sensitivity analysis.
 
@@ -20,132 +45,167 @@ def _run_batch_reactor(y, reactor):
         and TGL.
     reactor : dict
         Reactor parameters.
+    out : ndarray, optional
+        Array with shape (n_times, n_species) where the species mass
+        fractions at each time are stored.
 
     Returns
     -------
     tuple
         Final mass fraction of y_gases, y_liquids, and y_solids for a given
         time duration.
+    stats : dict
+        Integrator statistics for the run.
     """
 
-    # disable warnings about polynomial mid-point discontinuity in thermo data
-    ct.suppress_thermo_warnings()
+    states, stats = run_batch(y, reactor)
 
-    # get reactor parameters
-    tmax = reactor['time_duration']
+    # keep the full trajectory on the common time grid of the store
+    if out is not None:
+        grid = time_grid(reactor)
+        if np.array_equal(states.t, grid):
+            out[:] = states.Y
+        else:
+            out[:] = interpolate_arrays(states_to_arrays(states), grid)['Y']
 
-    # get reactor parameters
-    tmax = reactor['time_duration']
-    temp = reactor['temperature']
-    press = reactor['pressure']
-    energy = reactor['energy']
+    # sum of gases, liquids, and solids mass fractions
+    y_gases, y_liquids, y_solids = lumped_yields(states)
 
-    # get CTI file for Debiagi 2018 kinetics for softwood
-    cti_file = 'efr/debiagi_sw.cti'
+    # return final mass fractions and integrator statistics
+    return (y_gases[-1], y_liquids[-1], y_solids[-1]), stats
 
-    # time vector to evaluate reaction rates [s]
-    time = np.linspace(0, tmax, 100)
 
-    gas = ct.Solution(cti_file)
+def _problem(sens_analysis):
+    """
+    Define the problem for the sensitivity analysis.
+    """
+    problem = {
+        'num_vars': sens_analysis['num_vars'],
+        'names': sens_analysis['names'],
+        'bounds': sens_analysis['bounds']
+    }
+    return problem
 
-    gas.TPY = temp, press, y
 
-    r = ct.IdealGasReactor(gas, energy=energy)
+def _evaluate_block(start, block, reactor, names, traj_path=None, out_path=None, progress=None):
+    """
+    Run the batch reactor for a block of consecutive sample rows. Also used
+    as a task for the worker processes.
 
-    sim = ct.ReactorNet([r])
-    states = ct.SolutionArray(gas, extra=['t'])
+    Parameters
+    ----------
+    start : int
+        Row index of the first sample of the block.
+    block : ndarray
+        Sample rows of the block.
+    reactor : dict
+        Reactor parameters.
+    names : list of str
+        Species names for the sample columns.
+    traj_path : str, optional
+        Trajectory file where the trajectories of the block rows are written.
+    out_path : str, optional
+        Shared buffer where the outputs of the block rows are written. See
+        the `shared_buffer` module.
+    progress : Progress, optional
+        Progress updated after each row when the block runs in this process.
 
-    for tm in time:
-        sim.advance(tm)
-        states.append(r.thermo.state, t=tm)
+    Returns
+    -------
+    start : int
+        Row index of the first sample of the block.
+    y_out : ndarray or None
+        Batch reactor outputs for each row as [y_gases, y_liquids, y_solids].
+        `None` when the outputs are written to the shared buffer.
+    stats : list of dict
+        Integrator statistics for each row.
+    """
 
-    # species representing gases
-    sp_gases = ('C2H4', 'C2H6', 'CH2O', 'CH4', 'CO', 'CO2', 'H2')
+    store = open_store(traj_path, mode='r+')[0] if traj_path else None
 
-    # species representing liquids
-    sp_liquids = (
-        'C2H3CHO', 'C2H5CHO', 'C2H5OH', 'C5H8O4', 'C6H10O5', 'C6H5OCH3', 'C6H5OH',
-        'C6H6O3', 'C24H28O4', 'CH2OHCH2CHO', 'CH2OHCHO', 'CH3CHO', 'CH3CO2H',
-        'CH3OH', 'CHOCHO', 'CRESOL', 'FURFURAL', 'H2O', 'HCOOH', 'MLINO', 'U2ME12',
-        'VANILLIN', 'ACQUA'
-    )
+    if out_path:
+        y_out = attach_buffer(out_path)[start:start + len(block)]
+    else:
+        y_out = np.zeros([len(block), 3])
 
-    # species representing solids
-    sp_solids = (
-        'CELL', 'CELLA', 'GMSW', 'HCE1', 'HCE2', 'ITANN', 'LIG', 'LIGC', 'LIGCC',
-        'LIGH', 'LIGO', 'LIGOH', 'TANN', 'TGL', 'CHAR', 'GCH2O', 'GCO2', 'GCO',
-        'GCH3OH', 'GCH4', 'GC2H4', 'GC6H5OH', 'GCOH2', 'GH2', 'GC2H6'
-    )
+    stats = []
 
-    # sum of gases, liquids, and solids mass fractions
-    y_gases = states(*sp_gases).Y.sum(axis=1)
-    y_liquids = states(*sp_liquids).Y.sum(axis=1)
-    y_solids = states(*sp_solids).Y.sum(axis=1)
+    for i, p in enumerate(block):
+        y = dict(zip(names, p))
+        out = store[start + i] if store is not None else None
+        y_out[i], st = _run_batch_reactor(y, reactor, out)
+        stats.append(st)
 
-    # return final mass fractions
-    return y_gases[-1], y_liquids[-1], y_solids[-1]
+        if progress is not None:
+            progress.update(1, [st['wall_time']])
 
+    if store is not None:
+        store.flush()
 
-def batch_sensitivity(reactor, sens_analysis):
-    """
-    Perform a sensitivity analysis of the Debiagi 2018 pyrolysis kinetics
-    using the Sobol method.
+    return start, None if out_path else y_out, stats
 
-    Parameters
-    ----------
-    reactor : dict
-        Reactor parameters.
-    sens_analysis : dict
-        Sensitivity analysis parameters.
 
-    Notes
-    -----
-    S1 is the first-order sensitivity indices. S1_conf is the first-order
-    confidence (can be interpreted as error). ST is the total-order indices
-    while ST_conf is total-order confidence.
+def _evaluate_blocks(blocks, reactor, names, progress, traj_path=None, n_workers=None, out_path=None):
+    """
+    Evaluate blocks of sample rows in this process or in a pool of worker
+    processes. Results are yielded as each block completes, which for worker
+    processes is not necessarily the order of the blocks. At most two blocks
+    per worker are queued so blocks are only generated when they are needed.
+    The progress is updated after each sample in this process and after each
+    completed block of the worker processes.
+
+    Yields
+    ------
+    tuple
+        Results of `_evaluate_block()` for each block.
     """
 
-    # number of samples to generate for sensitivity analysis
-    n = sens_analysis['n_samples']
+    if not n_workers:
+        for start, block in blocks:
+            yield _evaluate_block(start, block, reactor, names, traj_path, out_path, progress)
+        return
 
-    # define problem for sensitivity analysis
-    problem = {
-        'num_vars': sens_analysis['num_vars'],
-        'names': sens_analysis['names'],
-        'bounds': sens_analysis['bounds']
-    }
+    def done(f):
+        result = f.result()
+        progress.update(len(result[2]), [x['wall_time'] for x in result[2]])
+        return result
 
-    # generate samples using Saltelli’s sampling scheme
-    param_values = saltelli.sample(problem, n)
+    with worker_pool(n_workers) as pool:
+        pending = set()
 
-    # store outputs from batch reactor where each row of
-    # y_out is [y_gases, y_liquids, y_solids]
-    y_out = np.zeros([param_values.shape[0], 3])
+        for start, block in blocks:
+            pending.add(pool.submit(_evaluate_block, start, block, reactor, names, traj_path, out_path))
 
-    for i, p in enumerate(param_values):
-        keys = problem['names']
-        y = dict(zip(keys, p))
-        y_out[i] = _run_batch_reactor(y, reactor)
+            if len(pending) >= 2 * n_workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    yield done(f)
 
-    # parallel options for Sobol analysis
+        for f in wait(pending).done:
+            yield done(f)
 
-    # perform Sobol analysis for gas, liquid, and solid phases
-    si_gas = sobol.analyze(problem, y_out[:, 0])
-    si_liquid = sobol.analyze(problem, y_out[:, 1])
-    si_solid = sobol.analyze(problem, y_out[:, 2])
+
+def _log_sobol(problem, n, n_rows, summary, si_gas, si_liquid, si_solid):
+    """
+    Log the sensitivity analysis parameters, integrator statistics, and Sobol
+    indices to the console.
+    """
 
     # log sensitivity analysis parameters to console
     results1 = (
         f'{" Sensitivity analysis of Debiagi 2018 kinetics ":-^80}\n\n'
         f'n         = {n:,}\n'
-        f'shape     = {param_values.shape}\n'
-        f'samples   = {param_values.shape[0]:,}\n'
+        f'shape     = {(n_rows, problem["num_vars"])}\n'
+        f'samples   = {n_rows:,}\n'
     )
     logging.info(results1)
 
+    # log integrator statistics aggregated over all samples
+    log_solver_summary(summary)
+
     # log results for gases to console
     results2 = (
-        f'Sobol analysis for gases\n\n'
+        f'\nSobol analysis for gases\n\n'
         f'{"Parameter":10} {"S1":>10} {"S1_conf":>10} {"ST":>10} {"ST_conf":>10}'
     )
     logging.info(results2)
@@ -185,6 +245,441 @@ def batch_sensitivity(reactor, sens_analysis):
         stconf = si_solid['ST_conf'][i]
         logging.info(f'{name:10} {s1:10.4f} {s1conf:10.4f} {st:10.4f} {stconf:10.4f}')
 
+
+def _sobol_analysis(problem, n, param_values, y_out, stats):
+    """
+    Perform Sobol analysis on the batch reactor outputs then log the results.
+
+    Parameters
+    ----------
+    problem : dict
+        Problem definition for the sensitivity analysis.
+    n : int
+        Number of samples used to generate the Saltelli samples.
+    param_values : ndarray
+        Saltelli samples which are the inputs to the batch reactor.
+    y_out : ndarray
+        Batch reactor outputs where each row is [y_gases, y_liquids, y_solids].
+    stats : list of dict
+        Integrator statistics for each sample.
+
+    Returns
+    -------
+    sa : SensitivityResult
+        Sensitivity analysis results. See `batch_sensitivity()`.
+    """
+
+    # perform Sobol analysis for gas, liquid, and solid phases
+    si_gas = sobol.analyze(problem, y_out[:, 0])
+    si_liquid = sobol.analyze(problem, y_out[:, 1])
+    si_solid = sobol.analyze(problem, y_out[:, 2])
+
+    summary = summarize_stats(stats)
+    _log_sobol(problem, n, param_values.shape[0], summary, si_gas, si_liquid, si_solid)
+
+    sa = SensitivityResult.from_indices(problem['names'], (si_gas, si_liquid, si_solid), param_values, y_out)
+
+    return sa
+
+
+def _batch_sensitivity(reactor, problem, n, traj_path=None, n_workers=None):
+    """
+    Sensitivity analysis with the complete sample matrix generated by SALib.
+    """
+
+    # generate samples using Saltelli’s sampling scheme
+    param_values = saltelli.sample(problem, n)
+    n_rows = param_values.shape[0]
+
+    # store outputs from batch reactor where each row of
+    # y_out is [y_gases, y_liquids, y_solids], worker processes write their
+    # rows straight into a shared buffer instead of returning them
+    if n_workers:
+        y_out, out_path = create_buffer((n_rows, 3))
+    else:
+        y_out, out_path = np.zeros([n_rows, 3]), None
+
+    # integrator statistics for each sample
+    stats = []
+
+    if traj_path:
+        create_store(traj_path, n_rows, time_grid(reactor), load_gas().species_names)
+
+    # blocks of whole Saltelli groups for the worker processes
+    rows = 8 * (2 * problem['num_vars'] + 2)
+    blocks = ((i, param_values[i:i + rows]) for i in range(0, n_rows, rows))
+
+    progress = Progress(n_rows, 'Sensitivity samples')
+
+    try:
+        for start, y_block, st in _evaluate_blocks(
+                blocks, reactor, problem['names'], progress, traj_path, n_workers, out_path):
+            if y_block is not None:
+                y_out[start:start + len(y_block)] = y_block
+            stats.extend(st)
+    finally:
+        # the parent keeps its mapping of the outputs after the file is removed
+        if out_path:
+            release_buffer(out_path)
+
+    if traj_path:
+        logging.info(f'Stored trajectories of {n_rows:,} samples in {traj_path}\n')
+
+    # Sobol analysis and log results on the outputs in place
+    sa = _sobol_analysis(problem, n, param_values, y_out, stats)
+
+    return sa
+
+
+def _streaming_sensitivity(reactor, problem, n, block_size, traj_path=None, n_workers=None):
+    """
+    Sensitivity analysis where the samples are generated, evaluated, and
+    added to the Sobol estimators one block at a time. Neither the sample
+    matrix nor the outputs are kept so the memory used depends on the block
+    size and not on the number of samples.
+    """
+
+    group = 2 * problem['num_vars'] + 2
+    n_rows = n * group
+
+    if traj_path:
+        create_store(traj_path, n_rows, time_grid(reactor), load_gas().species_names)
+
+    acc = SobolAccumulator(problem['num_vars'], 3)
+    summary = summarize_stats([])
+
+    blocks = saltelli_blocks(problem, n, block_size)
+    progress = Progress(n_rows, 'Sensitivity samples')
+
+    for _, y_block, stats in _evaluate_blocks(blocks, reactor, problem['names'], progress, traj_path, n_workers):
+        acc.add(y_block)
+        summarize_stats(stats, summary)
+
+    si_gas, si_liquid, si_solid = acc.indices()
+    _log_sobol(problem, n, n_rows, summary, si_gas, si_liquid, si_solid)
+
+    # only the Sobol indices are available without the stored outputs
+    sa = SensitivityResult.from_indices(problem['names'], (si_gas, si_liquid, si_solid))
+
+    return sa
+
+
+def plot_sensitivity(sa):
+    """
+    Plot the sensitivity analysis results. The sample effects are only
+    plotted when the samples and outputs were kept.
+
+    Parameters
+    ----------
+    sa : SensitivityResult
+        Sensitivity analysis results. See `batch_sensitivity()`.
+    """
+
+    if sa.param_values is not None:
+        plot_batch_effects(sa.param_values, sa.y_out)
+
+    plot_sobol(sa.names, *sa.si)
+
+
+def batch_sensitivity(reactor, sens_analysis, n_workers=None, plot=True):
+    """
+    Perform a sensitivity analysis of the Debiagi 2018 pyrolysis kinetics
+    using the Sobol method.
+
+    Parameters
+    ----------
+    reactor : dict
+        Reactor parameters.
+    sens_analysis : dict
+        Sensitivity analysis parameters.
+    n_workers : int, optional
+        Number of worker processes for the batch reactor runs. Default is to
+        run every sample in this process.
+    plot : bool, optional
+        Plot the results (default: True).
+
+    Returns
+    -------
+    sa : SensitivityResult
+        Sensitivity analysis results with the parameter `names`, the samples
+        `param_values`, the batch reactor outputs `y_out`, and the Sobol
+        indices for gases, liquids, and solids. The samples and outputs are
+        `None` for a streaming analysis.
+
+    Notes
+    -----
+    S1 is the first-order sensitivity indices. S1_conf is the first-order
+    confidence (can be interpreted as error). ST is the total-order indices
+    while ST_conf is total-order confidence.
+
+    If the `trajectories` parameter is a file path then the species mass
+    fractions of every sample at every time are stored in that file as a
+    memory-mapped array. See the `trajectory_store` module.
+
+    With worker processes the outputs of each sample are written by the
+    workers straight into a shared buffer that the Sobol analysis and the
+    plots then use in place. See the `shared_buffer` module.
+
+    If the `block_size` parameter is given then samples are generated and
+    evaluated in blocks of about that many rows and the Sobol indices are
+    estimated from running sums. Confidence intervals then use a normal
+    approximation instead of bootstrap resampling, second-order indices are
+    not estimated, and the sample effects are not plotted.
+    """
+
+    # number of samples to generate for sensitivity analysis
+    n = sens_analysis['n_samples']
+
+    # define problem for sensitivity analysis
+    problem = _problem(sens_analysis)
+
+    # optional storage of the full trajectory of each sample
+    traj_path = sens_analysis.get('trajectories')
+
+    # streaming evaluation with memory bounded by the block size
+    block_size = sens_analysis.get('block_size')
+
+    if block_size:
+        sa = _streaming_sensitivity(reactor, problem, n, block_size, traj_path, n_workers)
+    else:
+        sa = _batch_sensitivity(reactor, problem, n, traj_path, n_workers)
+
     # plot results
-    plot_batch_effects(param_values, y_out)
-    plot_sobol(problem['names'], si_gas, si_liquid, si_solid)
+    if plot:
+        plot_sensitivity(sa)
+
+    return sa
+
+
+# ----------------------------------------------------------------------------
+# Sharded sensitivity analysis
+# ----------------------------------------------------------------------------
+
+
+def _save_npz(path, **arrays):
+    """
+    Write arrays to a NumPy `.npz` file. The file is written to a temporary
+    path then renamed so other nodes never read a partially written file.
+    """
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def _load_meta(npz):
+    """
+    Metadata stored as a JSON string in a shard file.
+    """
+    return json.loads(str(npz['meta']))
+
+
+def _same_study(meta1, meta2):
+    """
+    Check if two shard metadata describe the same sensitivity study.
+    """
+    keys = ('reactor', 'problem', 'n', 'n_rows', 'n_shards', 'mechanism_hash')
+    return all(
+        json.dumps(meta1[k], sort_keys=True) == json.dumps(meta2[k], sort_keys=True)
+        for k in keys
+    )
+
+
+def generate_shards(reactor, sens_analysis, n_shards, shard_dir):
+    """
+    Generate the Saltelli samples for a sensitivity analysis and write them
+    as shard files that can be evaluated independently on any node.
+
+    Parameters
+    ----------
+    reactor : dict
+        Reactor parameters.
+    sens_analysis : dict
+        Sensitivity analysis parameters.
+    n_shards : int
+        Number of shard files to write.
+    shard_dir : str
+        Directory for the shard files and the study manifest.
+
+    Notes
+    -----
+    Each shard file `shard-XXXX.npz` contains the sample rows, their row
+    indices in the full sample matrix, and metadata with the reactor
+    parameters, problem definition, and mechanism hash. The same metadata is
+    written to `manifest.json` and used to reject mismatched shards when the
+    results are merged.
+
+    If the `block_size` parameter is given then the rows of each shard are
+    generated one shard at a time and fewer than `n_shards` shards may be
+    written so every shard holds whole Saltelli groups.
+    """
+
+    n = sens_analysis['n_samples']
+    problem = _problem(sens_analysis)
+
+    group = 2 * problem['num_vars'] + 2
+    n_rows = n * group
+
+    if sens_analysis.get('block_size'):
+        # generate the rows of each shard as one block of whole Saltelli
+        # groups so the full sample matrix is never held in memory
+        n_base = -(-n // n_shards)
+        n_shards = -(-n // n_base)
+        blocks = saltelli_blocks(problem, n, n_base * group)
+    else:
+        # generate samples using Saltelli’s sampling scheme then split them
+        # into contiguous blocks of rows for each shard
+        param_values = saltelli.sample(problem, n)
+        row_blocks = np.array_split(np.arange(n_rows), n_shards)
+        blocks = ((rows[0], param_values[rows]) for rows in row_blocks)
+
+    meta = {
+        'reactor': reactor,
+        'problem': problem,
+        'n': n,
+        'n_rows': n_rows,
+        'n_shards': n_shards,
+        'mechanism_hash': mechanism_hash()
+    }
+
+    os.makedirs(shard_dir, exist_ok=True)
+
+    with open(os.path.join(shard_dir, 'manifest.json'), 'w') as f:
+        json.dump(meta, f, indent=4)
+
+    for i, (start, block) in enumerate(blocks):
+        shard_meta = dict(meta, shard=i)
+        rows = np.arange(start, start + len(block))
+        path = os.path.join(shard_dir, f'shard-{i:04d}.npz')
+        _save_npz(path, rows=rows, param_values=block, meta=json.dumps(shard_meta))
+
+    results = (
+        f'{" Sensitivity analysis shards ":-^80}\n\n'
+        f'n         = {n:,}\n'
+        f'samples   = {n_rows:,}\n'
+        f'shards    = {n_shards:,}\n'
+        f'directory = {shard_dir}\n'
+    )
+    logging.info(results)
+
+
+def evaluate_shard(shard_path):
+    """
+    Evaluate the batch reactor for every sample in a shard file and write the
+    outputs next to it as `shard-XXXX-result.npz`. The reactor parameters are
+    taken from the shard file. A shard that already has a result file is
+    skipped so interrupted workers can be restarted.
+
+    Parameters
+    ----------
+    shard_path : str
+        Path to the shard file.
+    """
+
+    result_path = f'{os.path.splitext(shard_path)[0]}-result.npz'
+
+    if os.path.exists(result_path):
+        logging.info(f'Shard result {result_path} already exists, skipping')
+        return
+
+    shard = np.load(shard_path)
+    meta = _load_meta(shard)
+
+    # results are only valid for the mechanism the shards were generated with
+    if meta['mechanism_hash'] != mechanism_hash():
+        raise ValueError(f'mechanism {cti_file} does not match the mechanism of {shard_path}')
+
+    rows = shard['rows']
+    param_values = shard['param_values']
+    names = meta['problem']['names']
+
+    y_out = np.zeros([len(rows), 3])
+    stats = np.zeros([len(rows), len(stat_keys)])
+
+    progress = Progress(len(rows), f'Shard {meta["shard"]} samples')
+
+    for i, p in enumerate(param_values):
+        y = dict(zip(names, p))
+        y_out[i], st = _run_batch_reactor(y, meta['reactor'])
+        stats[i] = [st[k] for k in stat_keys]
+        progress.update(1, [st['wall_time']])
+
+    _save_npz(result_path, rows=rows, y_out=y_out, stats=stats, meta=json.dumps(meta))
+
+    logging.info(f'Evaluated {len(rows):,} samples of shard {meta["shard"]} in {result_path}')
+
+
+def merge_shards(shard_dir):
+    """
+    Merge the evaluated shards of a sensitivity study then perform the Sobol
+    analysis on the complete set of outputs.
+
+    Parameters
+    ----------
+    shard_dir : str
+        Directory containing the manifest, shard files, and shard results.
+
+    Returns
+    -------
+    sa : SensitivityResult
+        Sensitivity analysis results. See `batch_sensitivity()`.
+
+    Raises
+    ------
+    ValueError
+        If a shard result belongs to a different study or does not match
+        its shard file, if shards are missing, or if rows are missing or
+        duplicated.
+    """
+
+    with open(os.path.join(shard_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    n_rows = manifest['n_rows']
+    problem = manifest['problem']
+
+    param_values = np.full([n_rows, problem['num_vars']], np.nan)
+    y_out = np.full([n_rows, 3], np.nan)
+    stats = np.full([n_rows, len(stat_keys)], np.nan)
+    filled = np.zeros(n_rows, dtype=bool)
+    shards = set()
+
+    for path in sorted(glob.glob(os.path.join(shard_dir, 'shard-*-result.npz'))):
+        result = np.load(path)
+        meta = _load_meta(result)
+
+        if not _same_study(meta, manifest):
+            raise ValueError(f'shard result {path} does not match {shard_dir}/manifest.json')
+
+        shard_path = f'{path[:-len("-result.npz")]}.npz'
+        shard = np.load(shard_path)
+        rows = result['rows']
+
+        # the result must be for exactly the rows and study of its shard
+        if not np.array_equal(rows, shard['rows']) or _load_meta(shard) != meta:
+            raise ValueError(f'shard result {path} does not match the shard file {shard_path}')
+
+        if filled[rows].any() or len(np.unique(rows)) != len(rows):
+            raise ValueError(f'shard result {path} has rows that are already merged from another shard')
+
+        filled[rows] = True
+        param_values[rows] = shard['param_values']
+        y_out[rows] = result['y_out']
+        stats[rows] = result['stats']
+        shards.add(meta['shard'])
+
+    missing = sorted(set(range(manifest['n_shards'])) - shards)
+
+    if missing:
+        raise ValueError(f'missing results for shards {missing} in {shard_dir}')
+
+    if not filled.all():
+        raise ValueError(f'shard results in {shard_dir} do not cover all {n_rows:,} samples')
+
+    stats = [dict(zip(stat_keys, st)) for st in stats]
+
+    # Sobol analysis, log and plot results
+    sa = _sobol_analysis(problem, manifest['n'], param_values, y_out, stats)
+    plot_sensitivity(sa)
+
+    return sa
@@ -1,4 +1,7 @@
 import logging
+import numpy as np
+
+from results import Composition
 
 
 def bc_chem_analysis(feedstock):
@@ -13,7 +16,7 @@ def bc_chem_analysis(feedstock):
 
     Returns
     -------
-    bc_chem : dict
+    bc_chem : Composition
         Biomass composition.
     """
 
@@ -45,14 +48,6 @@ def bc_chem_analysis(feedstock):
     logging.info(results)
 
     # return daf results for use in reactor model
-    bc_chem = {
-        'cellulose': cell_daf,
-        'hemicellulose': hemi_daf,
-        'lignin-c': ligc_daf,
-        'lignin-h': ligh_daf,
-        'lignin-o': ligo_daf,
-        'tannins': tann_daf,
-        'triglycerides': tgl_daf
-    }
+    bc_chem = Composition('chem', np.array([cell_daf, hemi_daf, ligc_daf, ligh_daf, ligo_daf, tann_daf, tgl_daf]))
 
     return bc_chem
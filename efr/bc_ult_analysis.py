@@ -1,9 +1,12 @@
 import chemics as cm
 import logging
 import matplotlib.pyplot as plt
+import numpy as np
 
+from results import Composition
 
-def bc_ult_analysis(ult_bases):
+
+def bc_ult_analysis(ult_bases, plot=True):
     """
     Biomass composition based on characterization method discussed in Debiagi
     2015 paper. Uses only the C and H mass fractions from ultimate analysis of
@@ -11,12 +14,14 @@ def bc_ult_analysis(ult_bases):
 
     Parameters
     ----------
-    ult_bases : dict
+    ult_bases : UltBases
         Ultimate analysis bases.
+    plot : bool, optional
+        Plot the biomass characterization (default: True).
 
     Returns
     -------
-    bc_ult : dict
+    bc_ult : Composition
         Biomass composition.
     """
 
@@ -44,18 +49,11 @@ def bc_ult_analysis(ult_bases):
     logging.info(results)
 
     # return daf results for use in reactor model
-    bc_ult = {
-        'cellulose': bc["y_daf"][0],
-        'hemicellulose': bc["y_daf"][1],
-        'lignin-c': bc["y_daf"][2],
-        'lignin-h': bc["y_daf"][3],
-        'lignin-o': bc["y_daf"][4],
-        'tannins': bc["y_daf"][5],
-        'triglycerides': bc["y_daf"][6]
-    }
+    bc_ult = Composition('ult', np.array(bc['y_daf'][:7], dtype=float))
 
     # plot biomass characterization
-    fig, ax = plt.subplots(tight_layout=True)
-    cm.plot_biocomp(ax, yc, yh, bc['y_rm1'], bc['y_rm2'], bc['y_rm3'])
+    if plot:
+        fig, ax = plt.subplots(tight_layout=True)
+        cm.plot_biocomp(ax, yc, yh, bc['y_rm1'], bc['y_rm2'], bc['y_rm3'])
 
     return bc_ult
@@ -1,9 +1,12 @@
 import chemics as cm
 import logging
 import matplotlib.pyplot as plt
+import numpy as np
 
+from results import Composition
 
-def bc_ult_modified(feedstock):
+
+def bc_ult_modified(feedstock, plot=True):
     """
     Biomass composition based on characterization method discussed in Debiagi
     2015 paper. Uses the given values for yc, yh, alpha, beta, gamma, delta,
@@ -13,10 +16,12 @@ def bc_ult_modified(feedstock):
     ----------
     feedstock : dict
         Feedstock parameters.
+    plot : bool, optional
+        Plot the biomass characterization (default: True).
 
     Returns
     -------
-    bc_charact : dict
+    bc_charact : Composition
         Biomass composition.
     """
 
@@ -56,18 +61,11 @@ def bc_ult_modified(feedstock):
     logging.info(results)
 
     # return daf results for use in reactor model
-    bc_charact = {
-        'cellulose': bc["y_daf"][0],
-        'hemicellulose': bc["y_daf"][1],
-        'lignin-c': bc["y_daf"][2],
-        'lignin-h': bc["y_daf"][3],
-        'lignin-o': bc["y_daf"][4],
-        'tannins': bc["y_daf"][5],
-        'triglycerides': bc["y_daf"][6]
-    }
+    bc_charact = Composition('ultmod', np.array(bc['y_daf'][:7], dtype=float))
 
     # plot biomass characterization
-    fig, ax = plt.subplots(tight_layout=True)
-    cm.plot_biocomp(ax, yc, yh, bc['y_rm1'], bc['y_rm2'], bc['y_rm3'])
+    if plot:
+        fig, ax = plt.subplots(tight_layout=True)
+        cm.plot_biocomp(ax, yc, yh, bc['y_rm1'], bc['y_rm2'], bc['y_rm3'])
 
     return bc_charact
@@ -0,0 +1,44 @@
+from ult_analysis_bases import ult_analysis_bases
+from bc_chem_analysis import bc_chem_analysis
+from bc_ult_analysis import bc_ult_analysis
+from bc_ult_modified import bc_ult_modified
+
+
+def biomass_composition(feedstock, method, plot=True, ult_bases=None):
+    """
+    Biomass composition of the feedstock using the given method.
+
+    Parameters
+    ----------
+    feedstock : dict
+        Feedstock parameters.
+    method : str
+        Biomass composition method as `chem`, `ult`, or `ultmod`.
+    plot : bool, optional
+        Plot the biomass characterization for the `ult` and `ultmod` methods
+        (default: True).
+    ult_bases : UltBases, optional
+        Ultimate analysis bases of the feedstock. Computed and logged when
+        not given.
+
+    Returns
+    -------
+    bc : Composition
+        Biomass composition.
+    """
+
+    # ultimate analysis bases
+    if ult_bases is None:
+        ult_bases = ult_analysis_bases(feedstock)
+
+    # biomass composition
+    if method == 'chem':
+        bc = bc_chem_analysis(feedstock)
+    elif method == 'ult':
+        bc = bc_ult_analysis(ult_bases, plot=plot)
+    elif method == 'ultmod':
+        bc = bc_ult_modified(feedstock, plot=plot)
+    else:
+        raise ValueError(f'unknown biomass composition method {method!r}')
+
+    return bc
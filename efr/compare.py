@@ -0,0 +1,111 @@
+"""
+Compare the batch reactor yields of the chem, ult, and ultmod biomass
+composition methods. The compositions share one ultimate analysis and the
+three batch reactors run on the mechanism loaded in this process, or
+concurrently in a worker pool when workers are requested.
+"""
+
+import logging
+
+from batch_reactor import batch_result
+from batch_reactor import bc_to_y
+from batch_reactor import run_batch
+from bc_chem_analysis import bc_chem_analysis
+from bc_ult_analysis import bc_ult_analysis
+from bc_ult_modified import bc_ult_modified
+from plotter import plot_compare_composition
+from plotter import plot_compare_phases
+from results import components
+from workers import worker_pool
+
+# biomass composition methods in the comparison
+methods = ('chem', 'ult', 'ultmod')
+
+
+def _run_method(bc, reactor):
+    """
+    Batch reactor for the composition of one method, run in a worker.
+    """
+    states, stats = run_batch(bc_to_y(bc), reactor)
+    return batch_result(states, stats, reactor, bc)
+
+
+def plot_comparison(comp):
+    """
+    Plot the biomass compositions and the batch reactor phases of every
+    method in the comparison.
+
+    Parameters
+    ----------
+    comp : dict
+        Batch reactor result of each method as returned by
+        `compare_biocomp()`.
+    """
+    plot_compare_composition({m: dict(zip(components, r.composition.fractions)) for m, r in comp.items()})
+    plot_compare_phases({m: (r.t, [r.phase(p) for p in r.phases]) for m, r in comp.items()})
+
+
+def compare_biocomp(feedstock, reactor, ult_bases, n_workers=None, plot=True):
+    """
+    Batch reactor yields for the biomass composition of every method.
+
+    Parameters
+    ----------
+    feedstock : dict
+        Feedstock parameters.
+    reactor : dict
+        Reactor parameters.
+    ult_bases : UltBases
+        Ultimate analysis bases of the feedstock.
+    n_workers : int, optional
+        Number of worker processes. Default is to run every method in this
+        process.
+    plot : bool, optional
+        Plot the results (default: True).
+
+    Returns
+    -------
+    comp : dict
+        Batch reactor result of each method with its composition.
+    """
+
+    bcs = {
+        'chem': bc_chem_analysis(feedstock),
+        'ult': bc_ult_analysis(ult_bases, plot=False),
+        'ultmod': bc_ult_modified(feedstock, plot=False)
+    }
+
+    if n_workers:
+        with worker_pool(n_workers) as pool:
+            futures = {m: pool.submit(_run_method, bcs[m], reactor) for m in methods}
+            comp = {m: f.result() for m, f in futures.items()}
+    else:
+        # every method runs on the mechanism already loaded in this process
+        comp = {m: _run_method(bcs[m], reactor) for m in methods}
+
+    # log results to console
+    header = ' '.join(f'{m:>10}' for m in methods)
+
+    results = (
+        f'{" Biomass composition methods ":-^80}\n\n'
+        f'temperature   = {reactor["temperature"]} K\n'
+        f'time duration = {reactor["time_duration"]} s\n'
+        f'energy        = {reactor["energy"]}\n\n'
+        f'{"% mass":13} {header}'
+    )
+    logging.info(results)
+
+    for i, name in enumerate(components):
+        logging.info(f'{name:13} ' + ' '.join(f'{comp[m].composition.fractions[i] * 100:10.2f}' for m in methods))
+
+    logging.info('')
+
+    for name in comp[methods[0]].phases:
+        logging.info(f'{name:13} ' + ' '.join(f'{comp[m].final[name] * 100:10.2f}' for m in methods))
+
+    logging.info(f'{"solver time":13} ' + ' '.join(f'{comp[m].stats["wall_time"]:10.4f}' for m in methods) + '\n')
+
+    if plot:
+        plot_comparison(comp)
+
+    return comp
@@ -0,0 +1,360 @@
+"""
+Emulator of the lumped gas, liquid, and solid yields of the batch reactor as
+a function of the biomass composition, temperature, and residence time. The
+emulator is a ridge regression on polynomial features of the composition
+mass fractions, the scaled temperature, and the scaled log of time. It is
+trained from batch reactor runs at the points of a scrambled Sobol design.
+Runs are evaluated by the worker pool and cached on disk so a retrained
+emulator only runs the new points. Predictions outside the trained domain
+fall back to the batch reactor.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import numpy as np
+import os
+import warnings
+
+from scipy.stats import qmc
+
+from batch_reactor import interpolate_arrays
+from batch_reactor import lumped_yields
+from batch_reactor import run_batch
+from batch_reactor import sp_gases
+from batch_reactor import sp_liquids
+from batch_reactor import sp_metaplastics
+from batch_reactor import sp_solids
+from batch_reactor import states_to_arrays
+from mechanism import mechanism_hash
+from progress import Progress
+from results import outputs
+from shared_buffer import attach_buffer
+from shared_buffer import create_buffer
+from shared_buffer import release_buffer
+from workers import worker_pool
+
+
+def _lumped_trajectory(y, reactor, times, out_path, row):
+    """
+    Lumped yields with shape (n_times, 3) at the times written to a row of
+    the shared buffer, run in a worker. The reactor records its integrator
+    steps which are interpolated to the times.
+    """
+    states, _ = run_batch(y, dict(reactor, output='steps'))
+    arrays = interpolate_arrays(states_to_arrays(states), times)
+
+    species = list(states.species_names)
+    groups = (sp_gases, sp_liquids, sp_solids + sp_metaplastics)
+    cols = [[species.index(sp) for sp in g] for g in groups]
+
+    out = attach_buffer(out_path)
+    for k, c in enumerate(cols):
+        out[row, :, k] = arrays['Y'][:, c].sum(axis=1)
+
+
+def _run_key(y, reactor, times, mech):
+    """
+    Cache key of a training run.
+    """
+    key = {'y': y, 'reactor': reactor, 'times': times.tolist(), 'mechanism': mech}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _design(emulator, n, seed):
+    """
+    Compositions and temperatures of n training runs from a scrambled Sobol
+    sequence. Compositions are drawn within the bounds then normalized to
+    mass fractions that sum to one.
+    """
+    bounds = np.array(emulator['bounds'] + [emulator['temperatures']], dtype=float)
+
+    sampler = qmc.Sobol(d=len(bounds), scramble=True, seed=seed)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        x = qmc.scale(sampler.random(n), bounds[:, 0], bounds[:, 1])
+
+    comps = x[:, :-1] / x[:, :-1].sum(axis=1, keepdims=True)
+
+    return comps, x[:, -1]
+
+
+def _training_runs(reactor, emulator, comps, temps, times, n_workers):
+    """
+    Lumped yields of the training runs with shape (n_runs, n_times, 3) using
+    cached runs where possible.
+    """
+    cache_dir = emulator['cache_dir']
+    os.makedirs(cache_dir, exist_ok=True)
+    mech = mechanism_hash()
+
+    out, out_path = create_buffer((len(comps), len(times), 3))
+    todo = {}
+
+    for i, (comp, temp) in enumerate(zip(comps, temps)):
+        y = dict(zip(emulator['names'], comp.tolist()))
+        r = dict(reactor, temperature=float(temp))
+        path = os.path.join(cache_dir, f'{_run_key(y, r, times, mech)[:16]}.npy')
+        if os.path.exists(path):
+            out[i] = np.load(path)
+        else:
+            todo[i] = (y, r, path)
+
+    logging.info(f'Emulator training runs: {len(comps) - len(todo)} cached, {len(todo)} to run\n')
+
+    try:
+        if todo:
+            progress = Progress(len(todo), 'Emulator runs')
+            with worker_pool(n_workers) as pool:
+                futures = {
+                    i: pool.submit(_lumped_trajectory, y, r, times, out_path, i) for i, (y, r, _) in todo.items()}
+                for i, f in futures.items():
+                    f.result()
+                    tmp = f'{todo[i][2]}.tmp-{os.getpid()}.npy'
+                    np.save(tmp, out[i])
+                    os.replace(tmp, todo[i][2])
+                    progress.update(1)
+    finally:
+        release_buffer(out_path)
+
+    return out
+
+
+def _terms(n_vars, degree):
+    """
+    Variable indices of every monomial up to the degree, the empty tuple
+    being the constant term.
+    """
+    return [t for d in range(degree + 1) for t in itertools.combinations_with_replacement(range(n_vars), d)]
+
+
+class Emulator:
+    """
+    Polynomial ridge emulator of the lumped batch reactor yields.
+
+    Parameters
+    ----------
+    coef : ndarray
+        Coefficients with shape (n_terms, 3).
+    terms : list of tuple
+        Variable indices of each polynomial term.
+    domain : dict
+        Trained ranges of the composition mass fractions `comp_min` and
+        `comp_max`, the temperature `temperature`, and the time `time`.
+    reactor : dict
+        Reactor parameters of the training runs.
+    names : list of str
+        Reactor species of the composition.
+    validation : dict, optional
+        Error statistics of each output on the validation runs.
+    """
+
+    def __init__(self, coef, terms, domain, reactor, names, validation=None):
+        self.coef = np.asarray(coef)
+        self.terms = [tuple(t) for t in terms]
+        self.domain = domain
+        self.reactor = reactor
+        self.names = list(names)
+        self.validation = validation or {}
+
+    def _features(self, comps, temps, times):
+        """
+        Polynomial features of the scaled inputs.
+        """
+        t_lo, t_hi = self.domain['temperature']
+        s_lo, s_hi = np.log(self.domain['time'])
+        x = np.column_stack([
+            comps,
+            2 * (temps - t_lo) / (t_hi - t_lo) - 1,
+            2 * (np.log(times) - s_lo) / (s_hi - s_lo) - 1
+        ])
+        return np.column_stack([x[:, list(t)].prod(axis=1) for t in self.terms])
+
+    def in_domain(self, comps, temps, times):
+        """
+        Whether each point is inside the trained domain.
+        """
+        d = self.domain
+        return (
+            np.all(comps >= np.asarray(d['comp_min']) - 1e-12, axis=1)
+            & np.all(comps <= np.asarray(d['comp_max']) + 1e-12, axis=1)
+            & (temps >= d['temperature'][0]) & (temps <= d['temperature'][1])
+            & (times >= d['time'][0]) & (times <= d['time'][1])
+        )
+
+    def predict(self, comps, temps, times, fallback=True):
+        """
+        Lumped yields at many points.
+
+        Parameters
+        ----------
+        comps : array_like
+            Compositions with shape (n, n_species) in the order of `names`.
+            Rows are normalized to mass fractions.
+        temps : array_like
+            Temperatures [K] with shape (n,).
+        times : array_like
+            Residence times [s] with shape (n,).
+        fallback : bool, optional
+            Run the batch reactor for points outside the trained domain. If
+            false those points are NaN (default: True).
+
+        Returns
+        -------
+        ndarray
+            Mass fractions of gases, liquids, and solids with shape (n, 3).
+        """
+        comps = np.atleast_2d(np.asarray(comps, dtype=float))
+        comps = comps / comps.sum(axis=1, keepdims=True)
+        temps = np.broadcast_to(np.asarray(temps, dtype=float), len(comps))
+        times = np.broadcast_to(np.asarray(times, dtype=float), len(comps))
+
+        inside = self.in_domain(comps, temps, times)
+        y = np.full((len(comps), 3), np.nan)
+
+        if inside.any():
+            y[inside] = np.clip(self._features(comps[inside], temps[inside], times[inside]) @ self.coef, 0, 1)
+
+        outside = np.flatnonzero(~inside)
+
+        if fallback and len(outside) > 0:
+            logging.warning(f'{len(outside)} points outside the emulator domain use the batch reactor')
+            for i in outside:
+                r = dict(self.reactor, temperature=float(temps[i]), time_duration=float(times[i]))
+                states, _ = run_batch(dict(zip(self.names, comps[i])), r)
+                y[i] = [v[-1] for v in lumped_yields(states)]
+
+        return y
+
+    def save(self, path):
+        """
+        Save the emulator to a `.npz` file.
+        """
+        meta = {
+            'terms': self.terms,
+            'domain': self.domain,
+            'reactor': self.reactor,
+            'names': self.names,
+            'validation': self.validation,
+            'mechanism_hash': mechanism_hash()
+        }
+        np.savez(path, coef=self.coef, meta=json.dumps(meta, default=float))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an emulator saved with `save()`.
+        """
+        with np.load(path) as f:
+            coef = f['coef']
+            meta = json.loads(str(f['meta']))
+
+        if meta['mechanism_hash'] != mechanism_hash():
+            logging.warning(f'Mechanism has changed since the emulator in {path} was trained')
+
+        return cls(coef, meta['terms'], meta['domain'], meta['reactor'], meta['names'], meta['validation'])
+
+
+def _fit(features, y, ridge):
+    """
+    Ridge regression coefficients for every output. The constant term is
+    not penalized.
+    """
+    penalty = ridge * np.eye(features.shape[1])
+    penalty[0, 0] = 0.0
+    return np.linalg.solve(features.T @ features + penalty, features.T @ y)
+
+
+def train_emulator(path, reactor, emulator, n_workers=None):
+    """
+    Train the emulator from batch reactor runs then save it with the
+    validation error statistics.
+
+    Parameters
+    ----------
+    path : str
+        Path to the `.npz` file for the emulator.
+    reactor : dict
+        Reactor parameters. The temperature and time duration are set by the
+        emulator parameters.
+    emulator : dict
+        Emulator parameters.
+    n_workers : int, optional
+        Number of worker processes. Default is the number of CPUs.
+
+    Returns
+    -------
+    Emulator
+        Trained emulator.
+    """
+
+    n_train = emulator['n_train']
+    n_valid = emulator['n_validation']
+
+    # residence times spaced evenly in log time
+    t_min, t_max = emulator['time']
+    times = np.geomspace(t_min, t_max, emulator['n_times'])
+    reactor = dict(reactor, time_duration=t_max)
+
+    comps, temps = _design(emulator, n_train + n_valid, emulator['seed'])
+    yields = _training_runs(reactor, emulator, comps, temps, times, n_workers)
+
+    domain = {
+        'comp_min': comps[:n_train].min(axis=0).tolist(),
+        'comp_max': comps[:n_train].max(axis=0).tolist(),
+        'temperature': list(emulator['temperatures']),
+        'time': [t_min, t_max]
+    }
+
+    model = Emulator(
+        np.zeros((1, 3)), _terms(len(emulator['names']) + 2, emulator['degree']), domain, reactor,
+        emulator['names'])
+
+    def rows(idx):
+        n_t = len(times)
+        c = np.repeat(comps[idx], n_t, axis=0)
+        tk = np.repeat(temps[idx], n_t)
+        tt = np.tile(times, len(idx))
+        return c, tk, tt, yields[idx].reshape(-1, 3)
+
+    c, tk, tt, y = rows(np.arange(n_train))
+    model.coef = _fit(model._features(c, tk, tt), y, emulator['ridge'])
+
+    # error statistics on the validation runs
+    c, tk, tt, y = rows(np.arange(n_train, n_train + n_valid))
+    err = model.predict(c, tk, tt, fallback=False) - y
+    ok = np.all(np.isfinite(err), axis=1)
+    err, y = err[ok], y[ok]
+
+    model.validation = {
+        name: {
+            'rmse': float(np.sqrt(np.mean(err[:, k]**2))),
+            'max_abs': float(np.abs(err[:, k]).max()),
+            'r2': float(1 - (err[:, k]**2).sum() / ((y[:, k] - y[:, k].mean())**2).sum())
+        }
+        for k, name in enumerate(outputs)
+    }
+    model.validation['points'] = int(ok.sum())
+
+    model.save(path)
+
+    # log results to console
+    results = (
+        f'{" Batch reactor emulator ":-^80}\n\n'
+        f'training runs   = {n_train}\n'
+        f'validation runs = {n_valid} ({model.validation["points"]:,} points in domain)\n'
+        f'temperature     = {domain["temperature"]} K\n'
+        f'time            = {domain["time"]} s\n'
+        f'energy          = {reactor["energy"]}\n'
+        f'terms           = {len(model.terms)} (degree {emulator["degree"]})\n'
+        f'file            = {path}\n\n'
+        f'{"Output":10} {"rmse":>10} {"max abs":>10} {"r2":>10}'
+    )
+    logging.info(results)
+
+    for name in outputs:
+        v = model.validation[name]
+        logging.info(f'{name:10} {v["rmse"]:10.2e} {v["max_abs"]:10.2e} {v["r2"]:10.5f}')
+
+    return model
@@ -0,0 +1,279 @@
+"""
+Load feedstock characterization data from Excel workbooks into the
+`feedstock` parameters used by the ultimate analysis and biomass composition
+functions.
+
+Only the cells listed in the workbook layout are read, directly from the
+worksheet XML, using the values last calculated by Excel. The values are then
+cached in a columnar `.npz` file next to the workbook. The cache is used
+while the workbook modification time is unchanged. If the modification time
+changes, the workbook is hashed and only parsed again when its contents
+changed.
+"""
+
+import hashlib
+import json
+import numpy as np
+import os
+import zipfile
+
+from xml.etree import ElementTree
+
+# XML namespaces of the workbook parts
+_ns = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+}
+
+# cells of the feedstock fields in the workbook given as defined names or as
+# sheet references, the default layout is for data/blend3-feedstock.xlsx
+layout_blend3 = {
+    'ultimate_analysis': ['carbon', 'hydrogen', 'oxygen', 'nitrogen', 'sulfur', 'ash_ult', 'moisture'],
+    'chemical_analysis': {
+        'cellulose': "'Chemical Analysis'!F19",
+        'hemicellulose': "'Chemical Analysis'!F20",
+        'lignin_c': "'Chemical Analysis'!F21",
+        'lignin_h': "'Chemical Analysis'!F22",
+        'lignin_o': "'Chemical Analysis'!F23",
+        'tannins': "'Chemical Analysis'!F24",
+        'triglycerides': "'Chemical Analysis'!F25"
+    }
+}
+
+
+def _file_hash(path):
+    """
+    SHA-256 hash of a file read in chunks.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _columns(layout):
+    """
+    Layout as columns of field names, keys, and cell references. The key is
+    the list index for list fields and the dictionary key for dict fields.
+    """
+    fields, keys, refs = [], [], []
+
+    for field, cells in layout.items():
+        items = cells.items() if isinstance(cells, dict) else enumerate(cells)
+        for key, ref in items:
+            fields.append(field)
+            keys.append(str(key))
+            refs.append(ref)
+
+    return fields, keys, refs
+
+
+def _part(target):
+    """
+    Path in the workbook archive of a relationship target.
+    """
+    return target[1:] if target.startswith('/') else 'xl/' + target
+
+
+def _shared_strings(z, rels):
+    """
+    Shared strings of a workbook. Rich text items are joined into plain text.
+    """
+    for r in rels.findall('rel:Relationship', _ns):
+        if r.get('Type').endswith('/sharedStrings'):
+            sst = ElementTree.fromstring(z.read(_part(r.get('Target'))))
+            return [''.join(t.text or '' for t in si.iter(f'{{{_ns["main"]}}}t')) for si in sst]
+    return []
+
+
+def _cell_value(elem, shared, where):
+    """
+    Numeric value of a worksheet cell from its type `t` and value. Empty
+    cells are NaN. Strings that hold a number are converted and any other
+    cell raises a ValueError.
+    """
+    kind = elem.get('t', 'n')
+
+    if kind == 'inlineStr':
+        text = ''.join(t.text or '' for t in elem.iter(f'{{{_ns["main"]}}}t'))
+    else:
+        v = elem.find('main:v', _ns)
+        if v is None:
+            return np.nan
+        text = v.text or ''
+
+    if kind == 's':
+        text = shared()[int(text)]
+
+    if kind == 'e':
+        raise ValueError(f'cell {where} holds the error {text}')
+
+    if kind in ('n', 's', 'str', 'inlineStr'):
+        try:
+            return float(text)
+        except ValueError:
+            pass
+
+    raise ValueError(f'cell {where} is not numeric, it holds {text!r}')
+
+
+def _read_cells(path, refs):
+    """
+    Numeric values of the referenced cells in a workbook.
+    """
+
+    with zipfile.ZipFile(path) as z:
+        book = ElementTree.fromstring(z.read('xl/workbook.xml'))
+        rels = ElementTree.fromstring(z.read('xl/_rels/workbook.xml.rels'))
+
+        targets = {r.get('Id'): r.get('Target') for r in rels.findall('rel:Relationship', _ns)}
+        sheets = {}
+        for s in book.findall('main:sheets/main:sheet', _ns):
+            sheets[s.get('name')] = _part(targets[s.get(f'{{{_ns["r"]}}}id')])
+        names = {d.get('name'): d.text for d in book.findall('main:definedNames/main:definedName', _ns)}
+
+        # resolve defined names then split into sheet and cell
+        cells = {}
+        for ref in refs:
+            full = names.get(ref, ref)
+            sheet, cell = full.rsplit('!', 1)
+            cells[ref] = (sheet.strip("'"), cell.replace('$', ''))
+
+        # shared strings are only parsed if a needed cell refers to them
+        strings = []
+
+        def shared():
+            if not strings:
+                strings.extend(_shared_strings(z, rels))
+            return strings
+
+        # read only the needed cells of each needed sheet
+        values = {}
+        for sheet in {s for s, _ in cells.values()}:
+            wanted = {c for s, c in cells.values() if s == sheet}
+            with z.open(sheets[sheet]) as f:
+                for _, elem in ElementTree.iterparse(f):
+                    if elem.tag == f'{{{_ns["main"]}}}c':
+                        if elem.get('r') in wanted:
+                            where = f"'{sheet}'!{elem.get('r')}"
+                            values[(sheet, elem.get('r'))] = _cell_value(elem, shared, where)
+                        elem.clear()
+
+    return [values.get(cells[ref], np.nan) for ref in refs]
+
+
+def _cache_path(path):
+    """
+    Path to the cache file of a workbook.
+    """
+    folder, name = os.path.split(path)
+    return os.path.join(folder, '.feedstock-cache', os.path.splitext(name)[0] + '.npz')
+
+
+def _save_cache(cache, fields, keys, values, mtime, digest, layout_json):
+    """
+    Write the cache file of a workbook to a temporary file then move it into
+    place so an interrupted write never leaves a partial cache.
+    """
+    os.makedirs(os.path.dirname(cache), exist_ok=True)
+    tmp = f'{cache}.tmp-{os.getpid()}.npz'
+    np.savez(tmp, fields=np.array(fields), keys=np.array(keys), values=np.asarray(values),
+             mtime=mtime, sha256=digest, layout=layout_json)
+    os.replace(tmp, cache)
+
+
+def _feedstock(name, layout, fields, keys, values):
+    """
+    Feedstock parameters from the columns of field names, keys, and values.
+    """
+    feedstock = {'name': name}
+
+    for field, cells in layout.items():
+        if isinstance(cells, dict):
+            feedstock[field] = {}
+        else:
+            feedstock[field] = [np.nan] * len(cells)
+
+    for field, key, value in zip(fields, keys, values):
+        if isinstance(feedstock[field], dict):
+            feedstock[field][key] = float(value)
+        else:
+            feedstock[field][int(key)] = float(value)
+
+    return feedstock
+
+
+def load_feedstock(path, layout=layout_blend3, name=None):
+    """
+    Load the feedstock parameters from a workbook using the cached values
+    when the workbook has not changed.
+
+    Parameters
+    ----------
+    path : str
+        Path to the `.xlsx` workbook.
+    layout : dict, optional
+        Cell of each feedstock field as a defined name or a sheet reference
+        such as `'Chemical Analysis'!F19`. Fields with a list of cells are
+        loaded as lists and fields with a dict of cells are loaded as dicts.
+    name : str, optional
+        Feedstock name. Default is the name of the workbook file.
+
+    Returns
+    -------
+    feedstock : dict
+        Feedstock parameters with the fields in the layout.
+
+    Raises
+    ------
+    ValueError
+        If a cell of the layout holds an error or text that is not a number.
+    """
+
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    fields, keys, refs = _columns(layout)
+    layout_json = json.dumps(layout, sort_keys=True)
+
+    cache = _cache_path(path)
+    mtime = os.path.getmtime(path)
+    digest = None
+
+    if os.path.exists(cache):
+        with np.load(cache) as c:
+            cached = {k: c[k] for k in c.files}
+
+        if str(cached['layout']) == layout_json:
+            if float(cached['mtime']) == mtime:
+                return _feedstock(name, layout, fields, keys, cached['values'])
+
+            # modification time changed so check if the contents changed
+            digest = _file_hash(path)
+            if str(cached['sha256']) == digest:
+                _save_cache(cache, fields, keys, cached['values'], mtime, digest, layout_json)
+                return _feedstock(name, layout, fields, keys, cached['values'])
+
+    values = np.array(_read_cells(path, refs))
+    _save_cache(cache, fields, keys, values, mtime, digest or _file_hash(path), layout_json)
+
+    return _feedstock(name, layout, fields, keys, values)
+
+
+def load_feedstocks(paths, layout=layout_blend3):
+    """
+    Load the feedstock parameters from several workbooks.
+
+    Parameters
+    ----------
+    paths : list of str
+        Paths to the `.xlsx` workbooks.
+    layout : dict, optional
+        Cell of each feedstock field. See `load_feedstock()`.
+
+    Returns
+    -------
+    list of dict
+        Feedstock parameters for each workbook.
+    """
+    return [load_feedstock(path, layout) for path in paths]
@@ -0,0 +1,249 @@
+"""
+Fit the biomass characterization splitting parameters or the pre-exponential
+factors of selected reactions to measured gas, liquid, and solid yields.
+Several bounded local optimizations run at the same time from space-filling
+starting points. Each optimization step evaluates the candidate and its
+finite-difference neighbours as one batch in the worker pool. Evaluations are
+cached so repeated candidates are not run again. The fitted parameters are
+written to a JSON file.
+"""
+
+import cantera as ct
+import copy
+import json
+import logging
+import numpy as np
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from scipy.optimize import minimize
+from scipy.stats import qmc
+
+from batch_reactor import bc_to_y
+from batch_reactor import lumped_yields
+from batch_reactor import run_batch
+from bc_ult_modified import bc_ult_modified
+from biocomp import biomass_composition
+from mechanism import load_gas
+from progress import Progress
+from workers import worker_pool
+
+# lumped phases compared with the measured yields
+_phases = ('gases', 'liquids', 'solids')
+
+
+def _evaluate(method, names, x, feedstock, reactor, y0):
+    """
+    Final gas, liquid, and solid yields for one candidate, run in a worker.
+    Yields are NaN when the candidate gives a negative composition or the
+    integrator fails.
+    """
+
+    try:
+        if method == 'biocomp':
+            fs = copy.deepcopy(feedstock)
+            fs['biomass_characterization'].update(zip(names, x))
+            y = bc_to_y(bc_ult_modified(fs, plot=False))
+            if min(y.values()) < 0:
+                return (np.nan,) * 3
+            states, _ = run_batch(y, reactor)
+        else:
+            gas = load_gas()
+            for j, v in zip(names, x):
+                gas.set_multiplier(10**v, j)
+            try:
+                states, _ = run_batch(y0, reactor)
+            finally:
+                gas.set_multiplier(1.0)
+    except (ct.CanteraError, ValueError):
+        return (np.nan,) * 3
+
+    y_gases, y_liquids, y_solids = lumped_yields(states)
+
+    return y_gases[-1], y_liquids[-1], y_solids[-1]
+
+
+class _Objective:
+    """
+    Weighted squared error of the yields with batched and cached
+    evaluations. Calls return the objective and its finite-difference
+    gradient so several optimizations can share the same worker pool. The
+    cache holds the future of each evaluation from the time it is submitted
+    so optimizations that reach the same candidate wait for it instead of
+    running it again.
+    """
+
+    def __init__(self, pool, method, names, bounds, feedstock, reactor, y0, fitting):
+        self.pool = pool
+        self.args = (method, names)
+        self.run_args = (feedstock, reactor, y0)
+        self.bounds = bounds
+        self.step = fitting['fd_step'] * (bounds[:, 1] - bounds[:, 0])
+        self.measured = np.array([fitting['measured'][p] for p in _phases])
+        self.weights = np.array([fitting['weights'][p] for p in _phases])
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.evals = 0
+        self.hits = 0
+
+    def yields(self, xs):
+        """
+        Yields of a batch of candidates, evaluating only those not cached.
+        """
+        keys = [tuple(np.round(x, 12)) for x in xs]
+
+        with self.lock:
+            todo = [k for k in dict.fromkeys(keys) if k not in self.cache]
+            self.hits += len(keys) - len(todo)
+            self.evals += len(todo)
+
+            for k in todo:
+                self.cache[k] = self.pool.submit(_evaluate, *self.args, np.array(k), *self.run_args)
+
+        return np.array([self.cache[k].result() for k in keys])
+
+    def loss(self, y):
+        """
+        Weighted squared error of the yields. Failed candidates get an error
+        larger than any valid yields can give.
+        """
+        if not np.all(np.isfinite(y)):
+            return 10.0 * self.weights.sum()
+        return float((self.weights * (y - self.measured)**2).sum())
+
+    def __call__(self, x):
+        # forward differences that step backward at the upper bounds
+        h = np.where(x + self.step <= self.bounds[:, 1], self.step, -self.step)
+        xs = [x] + [x + h[i] * np.eye(len(x))[i] for i in range(len(x))]
+
+        ys = self.yields(xs)
+        f = self.loss(ys[0])
+        grad = np.array([(self.loss(y) - f) / hi for y, hi in zip(ys[1:], h)])
+
+        return f, grad
+
+
+def fit(feedstock, reactor, fitting, n_workers=None):
+    """
+    Fit the splitting parameters or the pre-exponential factors of the
+    kinetics to measured yields.
+
+    Parameters
+    ----------
+    feedstock : dict
+        Feedstock parameters.
+    reactor : dict
+        Reactor parameters.
+    fitting : dict
+        Fitting parameters. The `method` is `biocomp` to fit the splitting
+        parameters of the `ultmod` characterization or `kinetics` to fit the
+        log10 multipliers of the pre-exponential factors of the selected
+        reactions for the `composition` method.
+    n_workers : int, optional
+        Number of worker processes. Default is the number of CPUs.
+
+    Returns
+    -------
+    result : dict
+        Fitted parameter names and values, objective, fitted and measured
+        yields, results of every start, and the number of evaluations. The
+        `parameters` are the complete `biomass_characterization` with the
+        fitted values for the `biocomp` method or the pre-exponential
+        multiplier of each reaction index for the `kinetics` method.
+
+    Notes
+    -----
+    If the fitting parameters have an `output` path the result is written
+    to it as JSON.
+    """
+
+    method = fitting['method']
+
+    if method == 'biocomp':
+        names = fitting['biocomp']['names']
+        bounds = np.array(fitting['biocomp']['bounds'], dtype=float)
+        y0 = None
+    elif method == 'kinetics':
+        names = fitting['kinetics']['reactions']
+        bounds = np.array(fitting['kinetics']['bounds'], dtype=float)
+        y0 = bc_to_y(biomass_composition(feedstock, fitting['composition'], plot=False))
+    else:
+        raise ValueError(f'unknown fitting method {method!r}, use biocomp or kinetics')
+
+    sampler = qmc.LatinHypercube(d=len(names), seed=fitting['seed'])
+    starts = qmc.scale(sampler.random(fitting['n_starts']), bounds[:, 0], bounds[:, 1])
+    progress = Progress(len(starts), 'Fit starts')
+
+    with worker_pool(n_workers) as pool:
+        objective = _Objective(pool, method, names, bounds, feedstock, reactor, y0, fitting)
+
+        def run_start(x0):
+            res = minimize(
+                objective, x0, jac=True, method='L-BFGS-B', bounds=bounds,
+                options={'maxiter': fitting['max_iter']})
+            progress.update(1)
+            return res
+
+        with ThreadPoolExecutor(max_workers=len(starts)) as threads:
+            results = list(threads.map(run_start, starts))
+
+        best = min(results, key=lambda r: r.fun)
+        y_fit = objective.yields([best.x])[0]
+
+    if method == 'kinetics':
+        gas = load_gas()
+        labels = [f'log10 A[{j}]' for j in names]
+        equations = [gas.reaction(j).equation for j in names]
+        parameters = {j: 10**v for j, v in zip(names, best.x)}
+    else:
+        labels = list(names)
+        equations = [''] * len(names)
+        parameters = dict(feedstock['biomass_characterization'], **dict(zip(names, best.x)))
+
+    # log results to console
+    results_log = (
+        f'{" Fit to measured yields ":-^80}\n\n'
+        f'method        = {method}\n'
+        f'starts        = {len(starts)}\n'
+        f'evaluations   = {objective.evals:,} ({objective.hits:,} from cache)\n'
+        f'objective     = {best.fun:.4e}\n\n'
+        f'{"Parameter":14} {"fitted":>10} {"lower":>10} {"upper":>10}'
+    )
+    logging.info(results_log)
+
+    for label, v, (lo, hi), eq in zip(labels, best.x, bounds, equations):
+        logging.info(f'{label:14} {v:10.4f} {lo:10.4f} {hi:10.4f}  {eq[:30]}')
+
+    logging.info(f'\n{"% mass":14} {"measured":>10} {"fitted":>10}')
+
+    for i, p in enumerate(_phases):
+        logging.info(f'{p:14} {objective.measured[i] * 100:10.2f} {y_fit[i] * 100:10.2f}')
+
+    logging.info(f'\n{"Start":6} {"objective":>12} {"iterations":>11}  converged')
+
+    for k, r in enumerate(results):
+        logging.info(f'{k:<6} {r.fun:12.4e} {r.nit:11d}  {r.success}')
+
+    result = {
+        'method': method,
+        'names': list(names),
+        'x': best.x,
+        'parameters': parameters,
+        'objective': best.fun,
+        'yields': dict(zip(_phases, y_fit)),
+        'measured': dict(zip(_phases, objective.measured)),
+        'starts': [{'x0': x0, 'x': r.x, 'objective': r.fun, 'success': r.success} for x0, r in zip(starts, results)],
+        'evaluations': objective.evals,
+        'cache_hits': objective.hits
+    }
+
+    if fitting.get('output'):
+        path = fitting['output']
+        tmp = f'{path}.tmp-{os.getpid()}'
+        with open(tmp, 'w') as f:
+            json.dump(result, f, indent=4, default=lambda v: v.tolist())
+        os.replace(tmp, path)
+        logging.info(f'\nFitted parameters written to {path}')
+
+    return result
@@ -0,0 +1,334 @@
+"""
+Accuracy regression harness for kinetics engines. Reference trajectories and
+lumped yields are computed with the Cantera batch reactor for a fixed panel
+of compositions, temperatures, and energy settings then every other engine is
+checked against them for accuracy and speed.
+
+An engine is a function `engine(y, reactor)` with the same arguments as
+`run_batch()` that returns the times, the species names, and the species
+mass fractions with shape (n_times, n_species). Engines are registered in the
+`engines` dictionary with the `cases` they apply to, such as
+`{'energy': 'off'}`. Reference cases that do not match are skipped.
+"""
+
+import json
+import logging
+import numpy as np
+import timeit
+
+from batch_reactor import bc_to_y
+from batch_reactor import run_batch
+from batch_reactor import sp_gases
+from batch_reactor import sp_liquids
+from batch_reactor import sp_metaplastics
+from batch_reactor import sp_solids
+from biocomp import biomass_composition
+from mechanism import mechanism_hash
+from progress import Progress
+from streaming import saltelli_blocks
+
+# species of the gas, liquid, and solid phases
+_phases = {
+    'gases': sp_gases,
+    'liquids': sp_liquids,
+    'solids': sp_solids + sp_metaplastics
+}
+
+
+def _cantera_engine(y, reactor):
+    """
+    Reference engine using the Cantera batch reactor. A temperature profile
+    in the reactor parameters is ignored so the reference is always the
+    Cantera reactor.
+    """
+    reactor = {k: v for k, v in reactor.items() if k != 'profile'}
+    states, _ = run_batch(y, reactor)
+    return states.t, states.species_names, states.Y
+
+
+def _profile_engine(y, reactor):
+    """
+    Piecewise propagator engine with the temperature held at its initial
+    value. Only comparable with the reference when the energy is off.
+    """
+    tmax = reactor['time_duration']
+    temp = reactor['temperature']
+    profile = {'type': 'table', 'time': [0, tmax], 'temperature': [temp, temp]}
+    states, _ = run_batch(y, dict(reactor, profile=profile))
+    return states.t, states.species_names, states.Y
+
+
+# kinetics engines checked against the reference results and the case
+# settings each engine applies to
+engines = {
+    'cantera': {'run': _cantera_engine, 'cases': {}},
+    'profile': {'run': _profile_engine, 'cases': {'energy': 'off'}}
+}
+
+
+def _panel(feedstock, sens_analysis, n_random, seed=0):
+    """
+    Compositions for the reference panel. These are the Blend3 compositions
+    from the chem, ult, and ultmod methods and random rows of a Saltelli
+    design. Compositions are normalized to mass fractions that sum to one.
+    """
+
+    names = []
+    comps = []
+
+    for method in ('chem', 'ult', 'ultmod'):
+        y = bc_to_y(biomass_composition(feedstock, method, plot=False))
+        names.append(method)
+        comps.append([y[sp] for sp in sens_analysis['names']])
+
+    if n_random > 0:
+        problem = {
+            'num_vars': sens_analysis['num_vars'],
+            'names': sens_analysis['names'],
+            'bounds': sens_analysis['bounds']
+        }
+        group = 2 * problem['num_vars'] + 2
+        _, design = next(saltelli_blocks(problem, n_random, n_random * group))
+        rng = np.random.default_rng(seed)
+
+        for i in sorted(rng.choice(len(design), n_random, replace=False)):
+            names.append(f'saltelli-{i}')
+            comps.append(design[i])
+
+    comps = np.array(comps, dtype=float)
+    comps /= comps.sum(axis=1, keepdims=True)
+
+    return names, comps
+
+
+def _lump(species, y):
+    """
+    Lumped mass fractions of the gas, liquid, and solid phases with shape
+    (..., 3) from species mass fractions with shape (..., n_species).
+    """
+    cols = [[species.index(sp) for sp in phase] for phase in _phases.values()]
+    return np.stack([y[..., c].sum(axis=-1) for c in cols], axis=-1)
+
+
+def _tolerances(atol, names):
+    """
+    Tolerance of each name from a single tolerance or a dictionary of
+    tolerances by name with a `default` for the names it does not list.
+    """
+    if not isinstance(atol, dict):
+        return np.full(len(names), float(atol))
+
+    if 'default' not in atol and not set(names) <= set(atol):
+        raise ValueError(f'tolerances {atol} need a default for the names they do not list')
+
+    unknown = set(atol) - set(names) - {'default'}
+    if unknown:
+        raise ValueError(f'tolerances given for unknown names {sorted(unknown)}')
+
+    return np.array([float(atol.get(n, atol.get('default'))) for n in names])
+
+
+def _format_tolerance(atol):
+    """
+    Tolerance or dictionary of tolerances for the console.
+    """
+    if not isinstance(atol, dict):
+        return f'{atol:g}'
+    return ', '.join(f'{k} {v:g}' for k, v in atol.items())
+
+
+def generate_golden(path, reactor, feedstock, sens_analysis, golden):
+    """
+    Compute the reference results with the Cantera batch reactor and store
+    them in a compressed `.npz` file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the `.npz` file for the reference results.
+    reactor : dict
+        Reactor parameters. The temperature and energy are replaced by the
+        values of each case.
+    feedstock : dict
+        Feedstock parameters for the Blend3 compositions.
+    sens_analysis : dict
+        Sensitivity analysis parameters for the random compositions.
+    golden : dict
+        Reference panel parameters.
+    """
+
+    # the reference uses the Cantera reactor even when a profile is set
+    reactor = {k: v for k, v in reactor.items() if k != 'profile'}
+
+    names, comps = _panel(feedstock, sens_analysis, golden['n_random'])
+    keys = sens_analysis['names']
+
+    cases = [
+        (c, temp, energy)
+        for c in range(len(names))
+        for temp in golden['temperatures']
+        for energy in golden['energy']
+    ]
+
+    trajectories = []
+    ref_time = np.zeros(len(cases))
+    progress = Progress(len(cases), 'Reference cases')
+
+    for k, (c, temp, energy) in enumerate(cases):
+        # reference states are recorded on the common time grid
+        r = dict(reactor, temperature=temp, energy=energy, output='fixed')
+        ti = timeit.default_timer()
+        time, species, y = _cantera_engine(dict(zip(keys, comps[c])), r)
+        ref_time[k] = timeit.default_timer() - ti
+        trajectories.append(y)
+        progress.update(1, [ref_time[k]])
+
+    trajectories = np.array(trajectories, dtype=np.float32)
+
+    meta = {
+        'reactor': reactor,
+        'composition_names': names,
+        'species_keys': keys,
+        'species': list(species),
+        'mechanism_hash': mechanism_hash()
+    }
+
+    np.savez_compressed(
+        path,
+        time=time,
+        compositions=comps,
+        case_composition=np.array([c for c, _, _ in cases]),
+        case_temperature=np.array([t for _, t, _ in cases]),
+        case_energy=np.array([e for _, _, e in cases]),
+        trajectories=trajectories,
+        yields=_lump(list(species), trajectories.astype(float))[:, -1],
+        ref_time=ref_time,
+        meta=json.dumps(meta)
+    )
+
+    results = (
+        f'{" Reference results for kinetics engines ":-^80}\n\n'
+        f'compositions  = {len(names)}\n'
+        f'temperatures  = {golden["temperatures"]}\n'
+        f'energy        = {golden["energy"]}\n'
+        f'cases         = {len(cases)}\n'
+        f'shape         = {trajectories.shape}\n'
+        f'cantera time  = {ref_time.sum():.2f} s\n'
+        f'file          = {path}\n'
+    )
+    logging.info(results)
+
+
+def check_golden(path, golden, names=None):
+    """
+    Check kinetics engines against the stored reference results. Reports the
+    largest species and phase errors, the number of failed cases, and the
+    speedup relative to the reference Cantera runs. Species and phase mass
+    fractions are compared at every reference time.
+
+    Parameters
+    ----------
+    path : str
+        Path to the `.npz` file with the reference results.
+    golden : dict
+        Reference panel parameters with the `species_atol` and `phase_atol`
+        tolerances on mass fraction. Each is one tolerance or a dictionary
+        of tolerances by species or phase name with a `default`.
+    names : list of str, optional
+        Engines to check. Default is every registered engine.
+
+    Returns
+    -------
+    report : dict
+        Errors, failures, and speedup for each engine over the cases it
+        applies to.
+    """
+
+    ref = np.load(path)
+    meta = json.loads(str(ref['meta']))
+
+    if meta['mechanism_hash'] != mechanism_hash():
+        logging.warning(f'Mechanism has changed since the reference results in {path} were generated')
+
+    time = ref['time']
+    species = meta['species']
+    keys = meta['species_keys']
+    ref_y = ref['trajectories'].astype(float)
+    n_cases = len(ref_y)
+
+    species_atol = _tolerances(golden['species_atol'], species)
+    phase_atol = _tolerances(golden['phase_atol'], list(_phases))
+
+    report = {}
+
+    case_settings = {'energy': ref['case_energy'].astype(str), 'temperature': ref['case_temperature']}
+
+    for name in names or engines:
+        engine = engines[name]['run']
+
+        # reference cases the engine applies to
+        applies = np.ones(n_cases, dtype=bool)
+        for key, value in engines[name]['cases'].items():
+            applies &= case_settings[key] == value
+
+        cases = np.flatnonzero(applies)
+        sp_err = np.full(n_cases, np.nan)
+        ph_err = np.full(n_cases, np.nan)
+        failed = np.zeros(n_cases, dtype=bool)
+        eng_time = 0.0
+        progress = Progress(len(cases), f'Engine {name} cases')
+
+        for k in cases:
+            y0 = dict(zip(keys, ref['compositions'][ref['case_composition'][k]]))
+            r = dict(meta['reactor'], temperature=float(ref['case_temperature'][k]), energy=str(ref['case_energy'][k]))
+
+            ti = timeit.default_timer()
+            t, sp, y = engine(y0, r)
+            dt = timeit.default_timer() - ti
+            eng_time += dt
+            progress.update(1, [dt])
+
+            # interpolate the engine trajectory onto the reference times and
+            # reorder the species like the reference
+            y = np.asarray(y)
+            cols = [list(sp).index(s) for s in species]
+            y = np.column_stack([np.interp(time, t, y[:, c]) for c in cols])
+
+            sp_diff = np.abs(y - ref_y[k])
+            ph_diff = np.abs(_lump(species, y) - _lump(species, ref_y[k]))
+
+            sp_err[k] = sp_diff.max()
+            ph_err[k] = ph_diff.max()
+            failed[k] = np.any(sp_diff > species_atol) or np.any(ph_diff > phase_atol)
+
+        if len(cases) == 0:
+            logging.warning(f'Engine {name} applies to none of the reference cases')
+            continue
+
+        report[name] = {
+            'cases': len(cases),
+            'species_error': sp_err[cases].max(),
+            'phase_error': ph_err[cases].max(),
+            'worst_case': int(cases[np.argmax(sp_err[cases])]),
+            'failed': int(failed[cases].sum()),
+            'time': eng_time,
+            'speedup': ref['ref_time'][cases].sum() / eng_time
+        }
+
+    results = (
+        f'{" Kinetics engines against reference results ":-^80}\n\n'
+        f'cases        = {n_cases}\n'
+        f'species atol = {_format_tolerance(golden["species_atol"])}\n'
+        f'phase atol   = {_format_tolerance(golden["phase_atol"])}\n\n'
+        f'{"Engine":12} {"cases":>6} {"species err":>12} {"phase err":>12} {"failed":>8} {"time (s)":>10} '
+        f'{"speedup":>9}'
+    )
+    logging.info(results)
+
+    for name, rep in report.items():
+        logging.info(
+            f'{name:12} {rep["cases"]:6d} {rep["species_error"]:12.3e} {rep["phase_error"]:12.3e} '
+            f'{rep["failed"]:8d} {rep["time"]:10.3f} {rep["speedup"]:9.2f}'
+        )
+
+    return report
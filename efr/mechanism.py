@@ -0,0 +1,54 @@
+"""
+Loading and fingerprint of the Debiagi 2018 kinetics for softwood.
+"""
+
+import cantera as ct
+import functools
+import hashlib
+
+# CTI file for Debiagi 2018 kinetics for softwood
+cti_file = 'efr/debiagi_sw.cti'
+
+
+@functools.lru_cache(maxsize=None)
+def load_gas():
+    """
+    Load the Debiagi 2018 mechanism. The mechanism is parsed once per process
+    and the same `Solution` object is returned on later calls, so callers must
+    set its state before each use.
+
+    Returns
+    -------
+    gas : Solution
+        Cantera solution for the mechanism.
+    """
+
+    # disable warnings about discontinuity at polynomial mid-point in thermo data
+    # comment this line to show the warnings
+    ct.suppress_thermo_warnings()
+
+    gas = ct.Solution(cti_file)
+
+    return gas
+
+
+def mechanism_hash(path=cti_file):
+    """
+    SHA-256 hash of a kinetics file. Used to check that results from
+    different machines were computed with the same mechanism.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CTI file.
+
+    Returns
+    -------
+    str
+        Hexadecimal digest of the file contents.
+    """
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    return digest
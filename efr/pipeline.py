@@ -0,0 +1,315 @@
+"""
+Cached stage pipeline for the EFR model. The model chain is a dependency
+graph of stages. The output of each stage is cached on disk with a key made
+from its inputs, the keys of its upstream stages, and a hash of its source
+code and the kinetics file. A stage only runs when its key is not in the
+cache so changing a plotting option does not rerun the reactor models.
+
+Messages logged by a stage are cached with its output and logged again when
+the cached output is used. Plots are made from the stage outputs every run.
+"""
+
+import ast
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import pickle
+
+from batch_reactor import arrays_to_states
+from batch_reactor import batch_reactor
+from batch_reactor import plot_batch_reactor
+from batch_sensitivity import batch_sensitivity
+from batch_sensitivity import plot_sensitivity
+from bc_chem_analysis import bc_chem_analysis
+from bc_ult_analysis import bc_ult_analysis
+from bc_ult_modified import bc_ult_modified
+from biocomp import biomass_composition
+from compare import compare_biocomp
+from compare import methods
+from compare import plot_comparison
+from mechanism import cti_file
+from ult_analysis_bases import ult_analysis_bases
+
+# directory of the EFR source files
+_src_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class _Capture(logging.Handler):
+    """
+    Keep the messages logged while a stage runs.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        # progress reports only describe the run that made them
+        if record.name != 'progress':
+            self.messages.append(record.getMessage())
+
+
+@contextlib.contextmanager
+def _quiet():
+    """
+    Only log warnings within the context.
+    """
+    logger = logging.getLogger()
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
+
+
+def _file_hash(paths):
+    """
+    SHA-256 hash of the contents of several files.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _module_path(name, package_dir=_src_dir):
+    """
+    Path to the source file of an EFR module or package, `None` for modules
+    outside the EFR source directory.
+    """
+    base = os.path.join(package_dir, *name.split('.'))
+    for path in (base + '.py', os.path.join(base, '__init__.py')):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _source_files(modules):
+    """
+    Source files of the EFR modules and every EFR module they import,
+    directly or through other modules, in a fixed order.
+    """
+
+    todo = [_module_path(m) for m in modules]
+    files = set()
+
+    while todo:
+        path = todo.pop()
+        if path is None or path in files:
+            continue
+        files.add(path)
+
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                todo.extend(_module_path(a.name) for a in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0:
+                todo.append(_module_path(node.module))
+            elif isinstance(node, ast.ImportFrom):
+                # relative import within a package
+                package_dir = os.path.dirname(path)
+                for _ in range(node.level - 1):
+                    package_dir = os.path.dirname(package_dir)
+                if node.module:
+                    todo.append(_module_path(node.module, package_dir))
+                else:
+                    todo.extend(_module_path(a.name, package_dir) for a in node.names)
+
+    return sorted(files)
+
+
+def _stages(args, params):
+    """
+    Stages of the EFR model for the command line arguments and parameters.
+    Each stage lists its upstream stages, the inputs and the modules that
+    determine its output, and a function that computes the output from the
+    outputs of the upstream stages. The source files of a stage are its
+    modules and every EFR module they import.
+    """
+
+    def run_biocomp(out):
+        if args.biocomp == 'chem':
+            return bc_chem_analysis(params.feedstock)
+        elif args.biocomp == 'ult':
+            return bc_ult_analysis(out['ult_bases'], plot=False)
+        elif args.biocomp == 'ultmod':
+            return bc_ult_modified(params.feedstock, plot=False)
+
+    def run_batch(out):
+        return batch_reactor(params.reactor, out['biocomp'], plot=False)
+
+    def run_compare(out):
+        return compare_biocomp(params.feedstock, params.reactor, out['ult_bases'], args.workers, plot=False)
+
+    def run_sensitivity(out):
+        return batch_sensitivity(params.reactor, params.sensitivity_analysis, args.workers, plot=False)
+
+    stages = {
+        'ult_bases': {
+            'deps': [],
+            'inputs': {'feedstock': params.feedstock},
+            'code': ['ult_analysis_bases'],
+            'run': lambda out: ult_analysis_bases(params.feedstock)
+        },
+        'biocomp': {
+            'deps': ['ult_bases'],
+            'inputs': {'feedstock': params.feedstock, 'method': args.biocomp},
+            'code': ['bc_chem_analysis', 'bc_ult_analysis', 'bc_ult_modified'],
+            'run': run_biocomp
+        },
+        'batch': {
+            'deps': ['biocomp'],
+            'inputs': {'reactor': params.reactor},
+            'code': ['batch_reactor'],
+            'run': run_batch
+        }
+    }
+
+    # the comparison computes every composition and batch reactor in one stage
+    if args.biocomp == 'compare':
+        del stages['biocomp'], stages['batch']
+        stages['compare'] = {
+            'deps': ['ult_bases'],
+            'inputs': {'feedstock': params.feedstock, 'reactor': params.reactor},
+            'code': ['compare'],
+            'run': run_compare
+        }
+
+    if args.sensitivity_analysis:
+        stages['sensitivity'] = {
+            'deps': [],
+            'inputs': {'reactor': params.reactor, 'sensitivity_analysis': params.sensitivity_analysis},
+            'code': ['batch_sensitivity'],
+            'run': run_sensitivity
+        }
+
+    return stages
+
+
+def _stage_keys(stages):
+    """
+    Cache key of every stage in dependency order.
+    """
+
+    keys = {}
+    mech = _file_hash([cti_file])
+
+    for name, stage in stages.items():
+        code = _file_hash(_source_files(stage['code']) + [os.path.join(_src_dir, 'pipeline.py')])
+        key = {
+            'stage': name,
+            'inputs': stage['inputs'],
+            'code': code,
+            'mechanism': mech,
+            'deps': [keys[d] for d in stage['deps']]
+        }
+        keys[name] = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+    return keys
+
+
+def _cache_path(cache_dir, name, key):
+    """
+    Path to the cached output of a stage.
+    """
+    return os.path.join(cache_dir, f'{name}-{key[:16]}.pkl')
+
+
+def run_pipeline(args, params, cache_dir='.efr-cache', use_cache=True, dry_run=False):
+    """
+    Run the stages of the EFR model that are not cached then plot the
+    results.
+
+    Parameters
+    ----------
+    args : Namespace
+        Command line arguments.
+    params : module
+        Parameters with the `feedstock`, `reactor`, and
+        `sensitivity_analysis` dictionaries.
+    cache_dir : str, optional
+        Directory for the cached stage outputs.
+    use_cache : bool, optional
+        Use cached outputs. If false every stage runs but outputs are still
+        written to the cache (default: True).
+    dry_run : bool, optional
+        Only log which stages would run (default: False).
+
+    Returns
+    -------
+    out : dict
+        Result object of each stage, see the `results` module. Empty for a
+        dry run.
+    """
+
+    stages = _stages(args, params)
+    keys = _stage_keys(stages)
+
+    # a stage runs if no output is cached under its key, the key includes the
+    # keys of the upstream stages so a changed upstream stage gives its
+    # downstream stages new keys and they run unless those keys are cached
+    status = {}
+    for name in stages:
+        cached = use_cache and os.path.exists(_cache_path(cache_dir, name, keys[name]))
+        status[name] = 'cached' if cached else 'run'
+
+    if dry_run:
+        results = (
+            f'{" Pipeline dry run ":-^80}\n\n'
+            f'{"Stage":14} {"Key":18} {"Status":>8}'
+        )
+        logging.info(results)
+        for name in stages:
+            logging.info(f'{name:14} {keys[name][:16]:18} {status[name]:>8}')
+        logging.info(f'{"plots":14} {"-":18} {"run":>8}')
+        return {}
+
+    os.makedirs(cache_dir, exist_ok=True)
+    out = {}
+
+    for name, stage in stages.items():
+        path = _cache_path(cache_dir, name, keys[name])
+
+        if status[name] == 'cached':
+            with open(path, 'rb') as f:
+                out[name], messages = pickle.load(f)
+            for msg in messages:
+                logging.info(msg)
+            logging.info(f'[{name} output from cache {path}]\n')
+            continue
+
+        capture = _Capture()
+        logging.getLogger().addHandler(capture)
+
+        try:
+            out[name] = stage['run'](out)
+        finally:
+            logging.getLogger().removeHandler(capture)
+
+        tmp = f'{path}.tmp-{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            pickle.dump((out[name], capture.messages), f)
+        os.replace(tmp, path)
+
+    # plots are made from the stage outputs every run
+    if args.biocomp == 'compare':
+        with _quiet():
+            for method in methods[1:]:
+                biomass_composition(params.feedstock, method, plot=True, ult_bases=out['ult_bases'])
+        plot_comparison(out['compare'])
+    else:
+        if args.biocomp in ('ult', 'ultmod'):
+            with _quiet():
+                biomass_composition(params.feedstock, args.biocomp, plot=True, ult_bases=out['ult_bases'])
+        plot_batch_reactor(arrays_to_states(out['batch'].arrays()))
+
+    if 'sensitivity' in out:
+        plot_sensitivity(out['sensitivity'])
+
+    return out
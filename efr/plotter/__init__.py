@@ -5,5 +5,8 @@ from .batch_figures import plot_solids_metaplastics
 from .batch_figures import plot_phases_and_temp
 from .batch_figures import plot_barh
 from .batch_figures import plot_batch_effects
+from .batch_figures import plot_lumped_spread
+from .batch_figures import plot_compare_composition
+from .batch_figures import plot_compare_phases
 
 from .sa_figures import plot_sobol
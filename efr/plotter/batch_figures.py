@@ -256,3 +256,77 @@ def plot_batch_effects(param_values, y_out):
         axs[i, 2].set_xlabel('TGL')
         axs[i, 2].set_ylabel(g)
         fig.colorbar(hb, ax=axs[i, 2])
+
+
+def plot_lumped_spread(time, lumped):
+    """
+    Plot the median and spread of lumped batch reactor yields over many
+    samples such as those stored by the sensitivity analysis.
+
+    Parameters
+    ----------
+    time : ndarray
+        Times of the stored trajectories.
+    lumped : dict
+        Mass fractions with shape (n_samples, n_times) for each group such as
+        gases, liquids, and solids.
+    """
+    fig, ax = plt.subplots(tight_layout=True)
+
+    for i, (name, y) in enumerate(lumped.items()):
+        q05, q50, q95 = np.percentile(y, [5, 50, 95], axis=0)
+        ax.fill_between(time, q05, q95, color=f'C{i}', alpha=0.3, lw=0)
+        ax.plot(time, q50, color=f'C{i}', label=name)
+
+    _style_line(ax, xlabel='Time [s]', ylabel='Mass fraction [-]', title='Median and 5–95% range', legend='best')
+
+
+def plot_compare_composition(y_in):
+    """
+    Plot the biomass composition of several methods as grouped horizontal
+    bars.
+
+    Parameters
+    ----------
+    y_in : dict
+        Mass fractions of the biomass species for each method.
+    """
+    fig, ax = plt.subplots(tight_layout=True)
+
+    names = list(y_in)
+    species = list(y_in[names[0]])
+    pos = np.arange(len(species))
+    height = 0.8 / len(names)
+
+    for i, name in enumerate(names):
+        ax.barh(pos + i * height, [y_in[name][sp] for sp in species], height=height, color=f'C{i}', label=name)
+
+    ax.set_yticks(pos + height * (len(names) - 1) / 2)
+    ax.set_yticklabels(species)
+    ax.set_xlabel('Mass fraction [-]')
+    ax.legend(loc='best', frameon=False)
+    _style_barh(ax)
+
+
+def plot_compare_phases(phases):
+    """
+    Plot the batch reactor phases of several biomass compositions on top of
+    each other.
+
+    Parameters
+    ----------
+    phases : dict
+        Times of the reactor states and the mass fractions of gases, liquids,
+        solids, and metaplastics at each time for each method.
+    """
+    fig, axs = plt.subplots(nrows=1, ncols=4, figsize=(14, 4), sharey=True, tight_layout=True)
+    titles = ('Gases', 'Liquids', 'Solids', 'Metaplastics')
+
+    for i, (name, (time, ys)) in enumerate(phases.items()):
+        for ax, y in zip(axs, ys):
+            ax.plot(time, y, color=f'C{i}', label=name)
+
+    for j, (ax, title) in enumerate(zip(axs, titles)):
+        _style_line(ax, xlabel='Time [s]', ylabel='Mass fraction [-]' if j == 0 else '', title=title)
+
+    axs[-1].legend(loc='best', frameon=False)
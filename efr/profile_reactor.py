@@ -0,0 +1,263 @@
+"""
+Batch reactor with a prescribed particle temperature history T(t). Every
+reaction in the Debiagi 2018 mechanism is first-order in a single reactant so
+at a fixed temperature and constant density the species mass fractions obey
+the linear system dY/dt = K(T) Y. The composition is advanced over short
+segments of constant temperature with the matrix exponential of K(T) dt.
+Propagators are cached by temperature and step size so they are reused
+between segments, profiles, and compositions.
+"""
+
+import cantera as ct
+import functools
+import numpy as np
+import timeit
+
+from scipy.linalg import expm
+
+from mechanism import load_gas
+
+
+def _stoich(gas, name):
+    """
+    Stoichiometric coefficients with shape (n_species, n_reactions). These
+    are methods in Cantera 2 and properties in Cantera 3.
+    """
+    nu = getattr(gas, name)
+    return np.asarray(nu() if callable(nu) else nu)
+
+
+@functools.lru_cache(maxsize=None)
+def _network():
+    """
+    Net stoichiometry and reactant of each reaction in the mechanism.
+    """
+    gas = load_gas()
+    nu_r = _stoich(gas, 'reactant_stoich_coeffs')
+    nu_p = _stoich(gas, 'product_stoich_coeffs')
+
+    reactants = []
+    for j in range(gas.n_reactions):
+        (idx,) = np.nonzero(nu_r[:, j])
+        rxn = gas.reaction(j)
+        if len(idx) != 1 or rxn.reversible:
+            raise ValueError(f'reaction {rxn.equation!r} is not first-order and irreversible')
+        reactants.append(idx[0])
+
+    return nu_p - nu_r, np.array(reactants)
+
+
+def rate_matrix(temp):
+    """
+    Matrix K of the linear system dY/dt = K Y for the species mass fractions
+    at a temperature. For reaction j with reactant A the mass fraction of
+    species i changes as ν_ij W_i k_j Y_A / W_A.
+
+    Parameters
+    ----------
+    temp : float
+        Temperature [K].
+
+    Returns
+    -------
+    k_mat : ndarray
+        Rate matrix with shape (n_species, n_species) [1/s].
+    """
+    gas = load_gas()
+    gas.TP = temp, ct.one_atm
+    k = gas.forward_rate_constants
+
+    nu, reactants = _network()
+    w = gas.molecular_weights
+
+    k_mat = np.zeros((gas.n_species, gas.n_species))
+    for j, a in enumerate(reactants):
+        k_mat[:, a] += nu[:, j] * w * k[j] / w[a]
+
+    return k_mat
+
+
+@functools.lru_cache(maxsize=4096)
+def _propagator(temp, dt, multipliers):
+    """
+    Matrix exponential of K(T) dt that advances the mass fractions by one
+    segment. The rate multipliers of the mechanism are part of the cache key
+    so propagators are rebuilt when they change.
+    """
+    return expm(rate_matrix(temp) * dt)
+
+
+def temperature_profile(profile, reactor, time):
+    """
+    Particle temperature at each time of the profile.
+
+    Parameters
+    ----------
+    profile : dict
+        Temperature profile. A `table` profile interpolates the `time` [s]
+        and `temperature` [K] lists. A `heating_rate` profile heats from the
+        `initial` temperature [K] at a constant `rate` [K/s] to the reactor
+        temperature then holds.
+    reactor : dict
+        Reactor parameters.
+    time : ndarray
+        Times [s].
+
+    Returns
+    -------
+    ndarray
+        Temperatures [K].
+    """
+
+    kind = profile['type']
+
+    if kind == 'table':
+        return np.interp(time, profile['time'], profile['temperature'])
+    elif kind == 'heating_rate':
+        return np.minimum(profile['initial'] + profile['rate'] * np.asarray(time), reactor['temperature'])
+    else:
+        raise ValueError(f'unknown temperature profile {kind!r}, use table or heating_rate')
+
+
+def _breakpoints(profile, reactor):
+    """
+    Times where the slope of the temperature profile changes. The profile is
+    linear between these times.
+    """
+    kind = profile['type']
+
+    if kind == 'table':
+        return np.asarray(profile['time'], dtype=float)
+    elif kind == 'heating_rate' and profile['rate'] > 0:
+        return np.array([(reactor['temperature'] - profile['initial']) / profile['rate']])
+    else:
+        return np.array([])
+
+
+def segments(profile, reactor, t0, t1, substeps=10, max_dt=5.0):
+    """
+    Segments of constant temperature for one output interval. The interval
+    is split at the breakpoints of the profile and each part is cut into
+    equal segments sized from its own temperature change, so the temperature
+    changes by no more than `max_dt` over any segment. The interval has at
+    least `substeps` segments in total.
+
+    Parameters
+    ----------
+    profile : dict
+        Temperature profile.
+    reactor : dict
+        Reactor parameters.
+    t0, t1 : float
+        Start and end of the interval [s].
+    substeps : int, optional
+        Least number of segments over the interval (default: 10).
+    max_dt : float, optional
+        Largest temperature change over a segment [K] (default: 5.0).
+
+    Returns
+    -------
+    edges : ndarray
+        Start and end times of the segments [s].
+    temps : ndarray
+        Temperature at the midpoint of each segment [K].
+    """
+    bps = _breakpoints(profile, reactor)
+    parts = np.concatenate([[t0], bps[(bps > t0) & (bps < t1)], [t1]])
+    change = np.abs(np.diff(temperature_profile(profile, reactor, parts)))
+
+    edges = [t0]
+    for a, b, dtemp in zip(parts[:-1], parts[1:], change):
+        n = max(int(np.ceil(dtemp / max_dt)), int(np.ceil(substeps * (b - a) / (t1 - t0))), 1)
+        edges.extend(np.linspace(a, b, n + 1)[1:])
+
+    edges = np.array(edges)
+    temps = temperature_profile(profile, reactor, 0.5 * (edges[:-1] + edges[1:]))
+
+    return edges, temps
+
+
+def run_profile(y, reactor, time):
+    """
+    Advance the batch reactor along the temperature profile in the reactor
+    parameters. Each interval of the time grid is split into segments of
+    constant temperature by `segments()` with the `substeps` and `max_dT`
+    of the profile. Each segment uses the temperature at its midpoint rounded
+    to `resolution` kelvin.
+
+    Parameters
+    ----------
+    y : dict
+        Initial mass fractions of the biomass species.
+    reactor : dict
+        Reactor parameters with the temperature `profile`.
+    time : ndarray
+        Times of the output intervals [s].
+
+    Returns
+    -------
+    states : SolutionArray
+        Reactor states with the time `t` at each state.
+    stats : dict
+        Number of segments and wall time of the run.
+
+    Notes
+    -----
+    The `output` reactor parameter sets which states are recorded as in
+    `run_batch()`. The `fixed` output records the state at each time, the
+    `steps` output records the end of every segment, and the `adaptive`
+    output only records a segment once a mass fraction has changed by at
+    least `output_tol` since the last recorded state. The integrator
+    tolerances do not apply because each segment is propagated exactly.
+    """
+
+    profile = reactor['profile']
+    substeps = profile.get('substeps', 10)
+    max_dt = profile.get('max_dT', 5.0)
+    resolution = profile.get('resolution', 0.1)
+    press = reactor['pressure']
+    output = reactor.get('output', 'fixed')
+    tol = reactor.get('output_tol', 1e-3) if output == 'adaptive' else 0.0
+
+    gas = load_gas()
+    temps = temperature_profile(profile, reactor, time)
+
+    # constant volume reactor so the density stays at its initial value
+    gas.TPY = temps[0], press, y
+    rho = gas.density
+    yk = gas.Y
+    y_last = yk
+    multipliers = tuple(gas.multiplier(j) for j in range(gas.n_reactions))
+
+    states = ct.SolutionArray(gas, extra=['t'])
+    states.append(TDY=(temps[0], rho, yk), t=time[0])
+
+    ti = timeit.default_timer()
+
+    n_steps = 0
+
+    for t0, t1 in zip(time[:-1], time[1:]):
+        edges, seg_temps = segments(profile, reactor, t0, t1, substeps, max_dt)
+        n_steps += len(seg_temps)
+
+        for ta, tb, temp in zip(edges[:-1], edges[1:], seg_temps):
+            temp = round(round(float(temp) / resolution) * resolution, 10)
+            yk = _propagator(temp, round(float(tb - ta), 15), multipliers) @ yk
+
+            if output != 'fixed' and tb < time[-1]:
+                # clip round-off so the state remains a valid composition
+                yk = np.clip(yk, 0, None)
+                if np.abs(yk - y_last).max() >= tol:
+                    states.append(TDY=(temperature_profile(profile, reactor, [tb])[0], rho, yk), t=tb)
+                    y_last = yk
+
+        if output == 'fixed' or t1 == time[-1]:
+            yk = np.clip(yk, 0, None)
+            states.append(TDY=(temperature_profile(profile, reactor, [t1])[0], rho, yk), t=t1)
+
+    stats = {
+        'steps': n_steps,
+        'wall_time': timeit.default_timer() - ti
+    }
+
+    return states, stats
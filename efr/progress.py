@@ -0,0 +1,127 @@
+"""
+Progress, throughput, and ETA reporting for runs with many samples. Reports
+are logged to the console and optionally written to a JSON status file at a
+fixed interval. Counters are kept in the parent process and updated with the
+results returned by worker processes.
+"""
+
+import json
+import logging
+import math
+import os
+import time
+import timeit
+
+# progress messages use their own logger so they can be told apart from results
+logger = logging.getLogger('progress')
+
+# reporting settings shared by every progress reporter
+settings = {
+    'interval': 10.0,
+    'status_file': None
+}
+
+
+def _format_time(seconds):
+    """
+    Format a duration in seconds as h:mm:ss.
+    """
+    if not math.isfinite(seconds):
+        return '--:--:--'
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{secs:02d}'
+
+
+class Progress:
+    """
+    Report the progress of a run with a known number of samples.
+
+    Parameters
+    ----------
+    total : int
+        Number of samples in the run.
+    label : str, optional
+        Name of the run shown in the reports.
+
+    Notes
+    -----
+    The report interval [s] and status file path are taken from the module
+    `settings`. An interval of zero or less turns off the console reports.
+    """
+
+    def __init__(self, total, label='Samples'):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.slowest = 0.0
+        self.interval = settings['interval']
+        self.status_file = settings['status_file']
+        self.start = timeit.default_timer()
+        self.last = self.start
+
+    def update(self, n, wall_times=()):
+        """
+        Add completed samples and report if the interval has passed.
+
+        Parameters
+        ----------
+        n : int
+            Number of samples completed since the last update.
+        wall_times : list of float, optional
+            Wall time of each completed sample [s].
+        """
+        self.done += n
+
+        if len(wall_times) > 0:
+            self.slowest = max(self.slowest, max(wall_times))
+
+        now = timeit.default_timer()
+
+        if now - self.last >= max(self.interval, 0) or self.done >= self.total:
+            self.last = now
+            self.report(now)
+
+    def status(self, now=None):
+        """
+        Current progress as a dictionary.
+        """
+        now = now or timeit.default_timer()
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else math.inf
+
+        status = {
+            'label': self.label,
+            'state': 'done' if self.done >= self.total else 'running',
+            'completed': self.done,
+            'total': self.total,
+            'samples_per_second': rate,
+            'slowest_sample': self.slowest,
+            'elapsed': elapsed,
+            'eta': eta if math.isfinite(eta) else None,
+            'updated': time.time()
+        }
+
+        return status
+
+    def report(self, now=None):
+        """
+        Log the progress and write the status file.
+        """
+        st = self.status(now)
+
+        if self.interval > 0:
+            pct = 100 * st['completed'] / self.total if self.total else 100.0
+            eta = math.inf if st['eta'] is None else st['eta']
+            logger.info(
+                f'{self.label} {st["completed"]:,}/{self.total:,} ({pct:.1f}%) | '
+                f'{st["samples_per_second"]:.2f}/s | slowest {st["slowest_sample"]:.3f} s | '
+                f'elapsed {_format_time(st["elapsed"])} | ETA {_format_time(eta)}'
+            )
+
+        if self.status_file:
+            tmp = f'{self.status_file}.tmp-{os.getpid()}'
+            with open(tmp, 'w') as f:
+                json.dump(st, f, indent=4)
+            os.replace(tmp, self.status_file)
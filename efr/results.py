@@ -0,0 +1,341 @@
+"""
+Typed result objects returned by the stages of the EFR model and bulk export
+of results to Parquet datasets. Results keep their values in NumPy arrays
+along with the names of the rows and columns so many runs can be stacked
+into tables without parsing the console output. The ultimate analysis bases
+and biomass compositions were dictionaries before and still support item
+access with the same keys. PyArrow is
+only imported by the export functions so the stages and workers that use the
+result objects do not pay for it.
+"""
+
+import dataclasses
+import numpy as np
+import os
+import uuid
+
+from collections.abc import Mapping
+
+from solver import stat_keys
+
+# entries of the ultimate analysis
+elements = ('C', 'H', 'O', 'N', 'S', 'ash', 'moisture')
+
+# biomass components of a composition
+components = ('cellulose', 'hemicellulose', 'lignin-c', 'lignin-h', 'lignin-o', 'tannins', 'triglycerides')
+
+# outputs of the sensitivity analysis
+outputs = ('gases', 'liquids', 'solids')
+
+
+@dataclasses.dataclass(eq=False)
+class UltBases:
+    """
+    Ultimate analysis on as-received, dry, dry ash-free, and dry ash-free
+    C, H, O bases [% mass]. Each basis has a value for every entry of
+    `elements` with NaN for entries that are not part of the basis.
+    """
+    ar: np.ndarray
+    dry: np.ndarray
+    daf: np.ndarray
+    dafcho: np.ndarray
+
+    @classmethod
+    def from_lists(cls, ar, dry, daf, dafcho):
+        """
+        Ultimate analysis bases from lists that only have the entries of each
+        basis.
+        """
+        def pad(x):
+            return np.pad(np.asarray(x, dtype=float), (0, len(elements) - len(x)), constant_values=np.nan)
+        return cls(pad(ar), pad(dry), pad(daf), pad(dafcho))
+
+    def __getitem__(self, basis):
+        # entries of the basis as a list like the former dictionary
+        x = getattr(self, basis)
+        return x[np.isfinite(x)].tolist()
+
+
+@dataclasses.dataclass(eq=False)
+class Composition(Mapping):
+    """
+    Biomass composition from one characterization method in the order of
+    `components`. The `data` are in the units of the method, % daf for `chem`
+    and mass fraction for `ult` and `ultmod`. Behaves as a read-only mapping
+    of component names to values.
+    """
+    method: str
+    data: np.ndarray
+
+    def __getitem__(self, name):
+        try:
+            return float(self.data[components.index(name)])
+        except ValueError:
+            raise KeyError(name) from None
+
+    def __iter__(self):
+        return iter(components)
+
+    def __len__(self):
+        return len(components)
+
+    @property
+    def fractions(self):
+        """
+        Mass fractions that sum to one.
+        """
+        return self.data / self.data.sum()
+
+
+@dataclasses.dataclass(eq=False)
+class BatchResult:
+    """
+    Batch reactor states with the species names and the species in each
+    phase. The mass fractions `Y` have shape (n_times, n_species).
+    """
+    t: np.ndarray
+    T: np.ndarray
+    P: np.ndarray
+    Y: np.ndarray
+    species: tuple
+    phases: dict
+    stats: dict
+    reactor: dict
+    composition: Composition = None
+
+    def species_index(self, names):
+        """
+        Columns of `Y` for the species names.
+        """
+        return [self.species.index(sp) for sp in names]
+
+    def phase(self, name):
+        """
+        Mass fraction of a phase at each time.
+        """
+        return self.Y[:, self.species_index(self.phases[name])].sum(axis=1)
+
+    @property
+    def final(self):
+        """
+        Final mass fraction of each phase.
+        """
+        return {name: float(self.phase(name)[-1]) for name in self.phases}
+
+    def arrays(self):
+        """
+        Reactor states as the arrays used by `arrays_to_states()`.
+        """
+        return {'t': self.t, 'T': self.T, 'P': self.P, 'Y': self.Y}
+
+
+@dataclasses.dataclass(eq=False)
+class SensitivityResult:
+    """
+    Sobol indices of the sensitivity analysis with shape (n_outputs, n_vars)
+    for the gas, liquid, and solid `outputs`. The samples and outputs are
+    `None` for a streaming analysis. The Sobol results of each output are
+    kept in `si` for plotting.
+    """
+    names: list
+    S1: np.ndarray
+    S1_conf: np.ndarray
+    ST: np.ndarray
+    ST_conf: np.ndarray
+    si: tuple
+    param_values: np.ndarray = None
+    y_out: np.ndarray = None
+
+    @classmethod
+    def from_indices(cls, names, si, param_values=None, y_out=None):
+        """
+        Sensitivity result from the Sobol results of each output.
+        """
+        stack = {k: np.array([np.asarray(s[k], dtype=float) for s in si]) for k in ('S1', 'S1_conf', 'ST', 'ST_conf')}
+        return cls(list(names), si=tuple(si), param_values=param_values, y_out=y_out, **stack)
+
+
+def runs_table(runs, run_ids):
+    """
+    One row per batch reactor run with the reactor settings, composition,
+    final phase yields, and integrator statistics.
+
+    Parameters
+    ----------
+    runs : list of BatchResult
+        Batch reactor results.
+    run_ids : list of str
+        Identifier of each run.
+
+    Returns
+    -------
+    Table
+        Arrow table of the runs.
+    """
+    import pyarrow as pa
+
+    cols = {
+        'run_id': run_ids,
+        'method': [r.composition.method if r.composition is not None else None for r in runs],
+        'temperature': [r.reactor['temperature'] for r in runs],
+        'pressure': [r.reactor['pressure'] for r in runs],
+        'time_duration': [r.reactor['time_duration'] for r in runs],
+        'energy': [r.reactor['energy'] for r in runs]
+    }
+
+    for i, c in enumerate(components):
+        cols[f'y0_{c}'] = [r.composition.fractions[i] if r.composition is not None else np.nan for r in runs]
+
+    for name in runs[0].phases:
+        cols[name] = [r.final[name] for r in runs]
+
+    for key in stat_keys:
+        cols[key] = [float(r.stats[key]) for r in runs]
+
+    return pa.table(cols)
+
+
+def trajectories_table(runs, run_ids):
+    """
+    One row per recorded state of each run with a column for the mass
+    fraction of each species.
+
+    Parameters
+    ----------
+    runs : list of BatchResult
+        Batch reactor results.
+    run_ids : list of str
+        Identifier of each run.
+
+    Returns
+    -------
+    Table
+        Arrow table of the states.
+    """
+    import pyarrow as pa
+
+    cols = {
+        'run_id': np.repeat(run_ids, [len(r.t) for r in runs]),
+        't': np.concatenate([r.t for r in runs]),
+        'T': np.concatenate([r.T for r in runs]),
+        'P': np.concatenate([r.P for r in runs])
+    }
+
+    y = np.concatenate([r.Y for r in runs])
+    for k, sp in enumerate(runs[0].species):
+        cols[sp] = y[:, k]
+
+    return pa.table(cols)
+
+
+def sensitivity_table(sa, run_id):
+    """
+    One row per output and parameter of the sensitivity analysis.
+
+    Parameters
+    ----------
+    sa : SensitivityResult
+        Sensitivity analysis results.
+    run_id : str
+        Identifier of the analysis.
+
+    Returns
+    -------
+    Table
+        Arrow table of the Sobol indices.
+    """
+    import pyarrow as pa
+
+    n_vars = len(sa.names)
+
+    cols = {
+        'run_id': [run_id] * (len(outputs) * n_vars),
+        'output': np.repeat(outputs, n_vars),
+        'parameter': sa.names * len(outputs),
+        'S1': sa.S1.ravel(),
+        'S1_conf': sa.S1_conf.ravel(),
+        'ST': sa.ST.ravel(),
+        'ST_conf': sa.ST_conf.ravel()
+    }
+
+    return pa.table(cols)
+
+
+def _write(directory, table, name):
+    """
+    Add a Parquet file to a dataset directory. The file is written under a
+    hidden name then renamed so readers never see a partial file.
+    """
+    import pyarrow.parquet as pq
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{name}.parquet')
+    tmp = os.path.join(directory, f'.{name}.parquet.tmp')
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def export_results(directory, runs=(), sensitivity=None, trajectories=False):
+    """
+    Append results to the Parquet datasets in a directory. Runs go to the
+    `runs` dataset, their states to `trajectories`, and Sobol indices to
+    `sensitivity`. Every call writes new files with a unique name so many
+    processes can append to the same directory.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the datasets.
+    runs : list of BatchResult, optional
+        Batch reactor results.
+    sensitivity : SensitivityResult, optional
+        Sensitivity analysis results.
+    trajectories : bool, optional
+        Also export every recorded state of the runs (default: False).
+
+    Returns
+    -------
+    run_ids : list of str
+        Identifier of each run. The sensitivity analysis uses the export
+        identifier.
+    """
+    export_id = uuid.uuid4().hex
+    run_ids = [f'{export_id}-{i}' for i in range(len(runs))]
+
+    if runs:
+        _write(os.path.join(directory, 'runs'), runs_table(runs, run_ids), export_id)
+        if trajectories:
+            _write(os.path.join(directory, 'trajectories'), trajectories_table(runs, run_ids), export_id)
+
+    if sensitivity is not None:
+        _write(os.path.join(directory, 'sensitivity'), sensitivity_table(sensitivity, export_id), export_id)
+
+    return run_ids
+
+
+def load_results(directory, name='runs', columns=None, filter=None):
+    """
+    Read an exported dataset. Only the requested columns and the row groups
+    that can match the filter are read.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the datasets.
+    name : str, optional
+        Dataset as `runs`, `trajectories`, or `sensitivity` (default: runs).
+    columns : list of str, optional
+        Columns to read. Default is every column.
+    filter : Expression, optional
+        Row filter such as `pyarrow.dataset.field('temperature') > 700`.
+
+    Returns
+    -------
+    Table
+        Arrow table of the matching rows.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(os.path.join(directory, name), format='parquet')
+    return dataset.to_table(columns=columns, filter=filter)
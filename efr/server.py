@@ -0,0 +1,379 @@
+"""
+Resident simulation service for the EFR model. A pool of worker processes
+keeps the Debiagi 2018 mechanism loaded and answers batch reactor and biomass
+composition requests sent to a local HTTP endpoint.
+
+Endpoints
+---------
+POST /run
+    Body is one request object or `{"requests": [...]}` with several request
+    objects. Results are streamed back as newline-delimited JSON in the order
+    they complete. Each line echoes the `id` of its request.
+GET /status
+    Number of workers, pending requests, completed requests, restarts of the
+    worker pool, and whether the last batch could be sent to the workers.
+
+Request object
+--------------
+id : any, optional
+    Identifier echoed back with the result.
+method : str, optional
+    Biomass composition method `chem`, `ult`, or `ultmod` (default: chem).
+feedstock : dict, optional
+    Feedstock parameters that replace those from the parameters file.
+composition : dict, optional
+    Biomass composition such as `{"cellulose": 0.4, ...}` used instead of a
+    composition method.
+y : dict, optional
+    Initial mass fractions of the reactor species such as `{"CELL": 0.4, ...}`
+    used instead of a biomass composition.
+reactor : dict, optional
+    Reactor parameters that replace those from the parameters file.
+run : bool, optional
+    Run the batch reactor. If false only the composition is returned
+    (default: true).
+trajectory : bool, optional
+    Also return the lumped yields at each reactor time (default: false).
+"""
+
+import functools
+import json
+import logging
+import math
+import numpy as np
+import os
+import queue
+import threading
+import timeit
+
+from collections.abc import Mapping
+from concurrent.futures import Future
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from batch_reactor import bc_to_y
+from batch_reactor import lumped_yields
+from batch_reactor import run_batch
+from biocomp import biomass_composition
+from workers import warm_up
+from workers import worker_pool
+
+
+def _plain(obj):
+    """
+    Convert NumPy values in a result to plain Python values that can be
+    written as JSON. NaN values are converted to `None`.
+    """
+    if isinstance(obj, Mapping):
+        return {k: _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        return [_plain(v) for v in obj]
+    if isinstance(obj, (float, np.floating)):
+        return None if math.isnan(obj) else float(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    return obj
+
+
+def _run_request(req):
+    """
+    Run one complete request in a worker process.
+    """
+
+    result = {'id': req.get('id')}
+
+    # initial mass fractions of the reactor species
+    if 'y' in req:
+        y = req['y']
+    else:
+        bc = req.get('composition') or biomass_composition(req['feedstock'], req['method'], plot=False)
+        result['composition'] = bc
+        y = bc_to_y(bc)
+
+    if req.get('run', True):
+        states, stats = run_batch(y, req['reactor'])
+        y_gases, y_liquids, y_solids = lumped_yields(states)
+
+        result['yields'] = {'gases': y_gases[-1], 'liquids': y_liquids[-1], 'solids': y_solids[-1]}
+        result['stats'] = stats
+
+        if req.get('trajectory'):
+            result['trajectory'] = {'t': states.t, 'gases': y_gases, 'liquids': y_liquids, 'solids': y_solids}
+
+    return _plain(result)
+
+
+def run_requests(requests):
+    """
+    Run a batch of requests in a worker process. An error in one request is
+    returned as its result and does not affect the other requests.
+
+    Parameters
+    ----------
+    requests : list of dict
+        Complete requests with the `reactor` and `feedstock` parameters.
+
+    Returns
+    -------
+    list of dict
+        Result for each request.
+    """
+    results = []
+
+    for req in requests:
+        try:
+            results.append(_run_request(req))
+        except Exception as e:
+            results.append({'id': req.get('id'), 'error': f'{type(e).__name__}: {e}'})
+
+    return results
+
+
+class _Batcher:
+    """
+    Collect requests from the handler threads into batches. Each batch is
+    split into one task per worker so a large batch runs on every worker of
+    the pool. A pool whose worker processes have died is replaced, and
+    requests that cannot be sent get the error as their result.
+    """
+
+    def __init__(self, pool, n_workers, batch_size, batch_window):
+        self.pool = pool
+        self.n_workers = n_workers
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.queue = queue.Queue()
+        self.completed = 0
+        self.restarts = 0
+        self.healthy = True
+        self.lock = threading.Lock()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def submit(self, request):
+        future = Future()
+        self.queue.put((request, future))
+        return future
+
+    def _dispatch(self):
+        while True:
+            # wait for a request then collect more until the batch is full or
+            # the batch window has passed
+            items = [self.queue.get()]
+            deadline = timeit.default_timer() + self.batch_window
+
+            while len(items) < self.batch_size:
+                timeout = deadline - timeit.default_timer()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            # spread the batch over the workers
+            n_tasks = min(self.n_workers, len(items))
+            for i in range(n_tasks):
+                chunk = items[i::n_tasks]
+
+                try:
+                    job = self._submit([req for req, _ in chunk])
+                except Exception as e:
+                    # the handlers of these requests are waiting on their futures
+                    logging.exception('Could not send requests to the worker pool')
+                    self.healthy = False
+                    for _, future in chunk:
+                        future.set_exception(e)
+                    continue
+
+                self.healthy = True
+                job.add_done_callback(functools.partial(self._resolve, chunk))
+
+    def _submit(self, requests):
+        """
+        Send requests to the pool as one task. A broken pool is replaced
+        once and the task is sent again.
+        """
+        try:
+            return self.pool.submit(run_requests, requests)
+        except BrokenProcessPool:
+            logging.warning('Worker pool is broken, starting a new pool')
+            self.pool.shutdown(wait=False)
+            self.pool = worker_pool(self.n_workers)
+            warm_up(self.pool, self.n_workers)
+            self.restarts += 1
+            return self.pool.submit(run_requests, requests)
+
+    def _resolve(self, items, job):
+        try:
+            results = job.result()
+        except Exception as e:
+            results = [{'id': req.get('id'), 'error': f'{type(e).__name__}: {e}'} for req, _ in items]
+
+        for (_, future), res in zip(items, results):
+            future.set_result(res)
+
+        # callbacks run in different threads
+        with self.lock:
+            self.completed += len(items)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Handle requests to the simulation service.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def _send_json(self, code, obj):
+        data = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f'{len(data):X}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path != '/status':
+            self._send_json(404, {'error': f'unknown endpoint {self.path}'})
+            return
+
+        batcher = self.server.batcher
+        status = {
+            'workers': self.server.n_workers,
+            'pending': batcher.queue.qsize(),
+            'completed': batcher.completed,
+            'restarts': batcher.restarts,
+            'healthy': batcher.healthy,
+            'uptime': timeit.default_timer() - self.server.start_time
+        }
+        self._send_json(200 if batcher.healthy else 503, status)
+
+    def do_POST(self):
+        if self.path != '/run':
+            self._send_json(404, {'error': f'unknown endpoint {self.path}'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length))
+            requests = body['requests'] if 'requests' in body else [body]
+            requests = [self.server.complete_request(req) for req in requests]
+        except (ValueError, TypeError, KeyError) as e:
+            self._send_json(400, {'error': f'invalid request: {e}'})
+            return
+
+        futures = {self.server.batcher.submit(req): req.get('id') for req in requests}
+
+        # stream each result as soon as it is available
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'id': futures[future], 'error': f'{type(e).__name__}: {e}'}
+            self._write_chunk(json.dumps(result).encode() + b'\n')
+
+        self._write_chunk(b'')
+
+
+class _Server(ThreadingHTTPServer):
+    """
+    HTTP server with the default parameters and the request batcher.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, reactor, feedstock, batcher, n_workers):
+        super().__init__(address, _Handler)
+        self.reactor = reactor
+        self.feedstock = feedstock
+        self.batcher = batcher
+        self.n_workers = n_workers
+        self.start_time = timeit.default_timer()
+
+    def complete_request(self, req):
+        """
+        Fill in the default parameters for a request.
+        """
+        if not isinstance(req, dict):
+            raise TypeError('request must be a JSON object')
+
+        for key in ('feedstock', 'reactor'):
+            if not isinstance(req.get(key, {}), dict):
+                raise TypeError(f'{key} must be a JSON object')
+
+        feedstock = dict(self.feedstock)
+
+        for key, value in req.get('feedstock', {}).items():
+            if isinstance(value, dict):
+                feedstock[key] = dict(feedstock.get(key, {}), **value)
+            else:
+                feedstock[key] = value
+
+        req = dict(req)
+        req['feedstock'] = feedstock
+        req['reactor'] = dict(self.reactor, **req.get('reactor', {}))
+        req.setdefault('method', 'chem')
+
+        return req
+
+
+def serve(reactor, feedstock, host='127.0.0.1', port=8765, n_workers=None, batch_size=16, batch_window=0.005):
+    """
+    Run the simulation service until it is interrupted.
+
+    Parameters
+    ----------
+    reactor : dict
+        Default reactor parameters for requests.
+    feedstock : dict
+        Default feedstock parameters for requests.
+    host : str, optional
+        Address to listen on. Default is the local host only.
+    port : int, optional
+        Port to listen on.
+    n_workers : int, optional
+        Number of worker processes. Default is the number of CPUs.
+    batch_size : int, optional
+        Maximum number of requests collected into one batch. A batch is split
+        into one task for each worker.
+    batch_window : float, optional
+        Time to wait for more requests before a batch is sent [s].
+    """
+
+    n_workers = n_workers or os.cpu_count()
+
+    pool = worker_pool(n_workers)
+    warm_up(pool, n_workers)
+
+    batcher = _Batcher(pool, n_workers, batch_size, batch_window)
+    server = _Server((host, port), reactor, feedstock, batcher, n_workers)
+
+    logging.info(
+        f'{" Simulation service ":-^80}\n\n'
+        f'address   = http://{host}:{port}\n'
+        f'workers   = {n_workers}\n'
+        f'batch     = {batch_size} requests or {batch_window * 1000:.1f} ms\n\n'
+        f'Press Ctrl+C to stop the service'
+    )
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.pool.shutdown()
@@ -0,0 +1,73 @@
+"""
+Output arrays shared between the parent process and the worker processes.
+The parent creates a memory-mapped `.npy` file, in `/dev/shm` where it is
+available, and sends only its path with each task. Workers write their
+results straight into their rows of the array so outputs never pass through
+the pool queue and the parent never holds a second copy of them.
+"""
+
+import functools
+import numpy as np
+import os
+import tempfile
+import uuid
+
+
+def _buffer_dir():
+    """
+    Directory for buffer files, shared memory if the system has it.
+    """
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def create_buffer(shape, dtype=np.float64, fill=np.nan):
+    """
+    Create an output array that worker processes can write into.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the array. Workers write to rows of the first axis.
+    dtype : data-type, optional
+        Data type of the array (default: float64).
+    fill : scalar, optional
+        Initial value of every element so rows that are never written can
+        be found (default: NaN).
+
+    Returns
+    -------
+    buffer : ndarray
+        Array backed by the shared file.
+    path : str
+        Path of the file to send to the workers and to `release_buffer()`.
+    """
+    # unique names so a worker never reuses the cached view of an old buffer
+    fd, path = tempfile.mkstemp(prefix=f'efr-{uuid.uuid4().hex}-', suffix='.npy', dir=_buffer_dir())
+    os.close(fd)
+
+    buffer = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+    buffer[...] = fill
+
+    return np.asarray(buffer), path
+
+
+@functools.lru_cache(maxsize=8)
+def attach_buffer(path):
+    """
+    Writable view of a buffer in a worker process. Each worker opens a
+    buffer once and keeps it for the following tasks.
+    """
+    return np.load(path, mmap_mode='r+')
+
+
+def release_buffer(path):
+    """
+    Remove the file of a buffer once the workers are done with it. Arrays
+    that are still mapped in the parent remain valid until they are freed.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,166 @@
+"""
+Functions for configuring the Cantera reactor network integrator and for
+collecting integrator statistics.
+"""
+
+import logging
+import numpy as np
+
+# integrator statistics of each run
+stat_keys = ('steps', 'wall_time')
+
+
+def check_solver(reactor):
+    """
+    Check the integrator settings in the reactor parameters before any
+    reactor is built.
+
+    Parameters
+    ----------
+    reactor : dict
+        Reactor parameters.
+
+    Raises
+    ------
+    ValueError
+        If a tolerance, the step limit, or the largest time step is not
+        positive.
+    """
+
+    for key in ('rtol', 'atol', 'max_steps', 'max_time_step'):
+        value = reactor.get(key)
+        if value is not None and not value > 0:
+            raise ValueError(f'{key} must be positive, got {value!r}')
+
+
+def configure_solver(sim, reactor):
+    """
+    Apply the integrator settings from the reactor parameters to a reactor
+    network. Settings that are missing or `None` keep the Cantera defaults.
+
+    Parameters
+    ----------
+    sim : ReactorNet
+        Cantera reactor network.
+    reactor : dict
+        Reactor parameters. Optional keys are `rtol`, `atol`, `max_steps`,
+        and `max_time_step`.
+
+    Notes
+    -----
+    The integrator always uses the dense Jacobian of CVODES evaluated by
+    finite differences. Sparse preconditioned strategies need Cantera 3.0 or
+    newer, which cannot load the CTI mechanism.
+    """
+
+    check_solver(reactor)
+
+    if reactor.get('rtol') is not None:
+        sim.rtol = reactor['rtol']
+
+    if reactor.get('atol') is not None:
+        sim.atol = reactor['atol']
+
+    if reactor.get('max_steps') is not None:
+        sim.max_steps = reactor['max_steps']
+
+    if reactor.get('max_time_step') is not None:
+        sim.max_time_step = reactor['max_time_step']
+
+
+def solver_stats(wall_time, steps):
+    """
+    Integrator statistics for a completed reactor network simulation.
+
+    Parameters
+    ----------
+    wall_time : float
+        Wall time of the integration [s].
+    steps : int
+        Number of integrator steps counted by the caller.
+
+    Returns
+    -------
+    stats : dict
+        Number of steps and wall time with the keys in `stat_keys`.
+
+    Notes
+    -----
+    Cantera 2.x does not report the function and Jacobian evaluations of the
+    integrator so they are not part of the statistics. Steps are counted by
+    stepping the integrator one step at a time.
+    """
+
+    stats = {
+        'steps': steps,
+        'wall_time': wall_time
+    }
+
+    return stats
+
+
+def summarize_stats(stats, summary=None):
+    """
+    Aggregate integrator statistics over several runs. Statistics can be
+    added in batches by passing the summary from a previous call so the
+    individual runs do not need to be kept.
+
+    Parameters
+    ----------
+    stats : list of dict
+        Integrator statistics for each run as returned by `solver_stats()`.
+    summary : dict, optional
+        Summary of previous runs that the new runs are added to.
+
+    Returns
+    -------
+    summary : dict
+        Number of runs and the total, count, minimum, and maximum of each
+        statistic. Counts exclude NaN values.
+    """
+
+    if summary is None:
+        summary = {'runs': 0}
+
+    summary['runs'] += len(stats)
+
+    for key in stat_keys:
+        values = np.array([s[key] for s in stats], dtype=float)
+        values = values[np.isfinite(values)]
+
+        agg = summary.setdefault(key, {'total': 0.0, 'count': 0, 'min': np.inf, 'max': -np.inf})
+        agg['total'] += values.sum()
+        agg['count'] += values.size
+
+        if values.size > 0:
+            agg['min'] = min(agg['min'], values.min())
+            agg['max'] = max(agg['max'], values.max())
+
+    return summary
+
+
+def log_solver_summary(summary):
+    """
+    Log a summary table of the integrator statistics to the console.
+
+    Parameters
+    ----------
+    summary : dict
+        Aggregated integrator statistics as returned by `summarize_stats()`.
+    """
+
+    results = (
+        f'\nSolver statistics for {summary["runs"]:,} runs\n\n'
+        f'{"Statistic":10} {"total":>12} {"mean":>12} {"min":>12} {"max":>12}'
+    )
+    logging.info(results)
+
+    for key in stat_keys:
+        s = summary[key]
+
+        if s['count'] == 0:
+            logging.info(f'{key:10} {"n/a":>12} {"n/a":>12} {"n/a":>12} {"n/a":>12}')
+            continue
+
+        mean = s['total'] / s['count']
+        logging.info(f'{key:10} {s["total"]:12.4g} {mean:12.4g} {s["min"]:12.4g} {s["max"]:12.4g}')
@@ -0,0 +1,371 @@
+"""
+Streaming sample generation and estimators. These are used when a study is
+too large to keep every sample and output in memory.
+"""
+
+import numpy as np
+import warnings
+
+from scipy.stats import norm
+from scipy.stats import qmc
+
+
+def saltelli_blocks(problem, n, block_size, skip=1024):
+    """
+    Generate Saltelli samples in blocks of rows instead of one matrix.
+
+    Parameters
+    ----------
+    problem : dict
+        Problem definition with `num_vars` and `bounds`.
+    n : int
+        Number of base samples. The design has n * (2 * num_vars + 2) rows.
+    block_size : int
+        Approximate number of rows in each block. Blocks always contain whole
+        groups of 2 * num_vars + 2 rows.
+    skip : int, optional
+        Number of points skipped at the start of the Sobol sequence.
+
+    Yields
+    ------
+    start : int
+        Row index of the first row of the block in the full design.
+    block : ndarray
+        Sample rows with shape (rows, num_vars).
+
+    Notes
+    -----
+    Rows follow the layout of `SALib.sample.saltelli.sample` with second
+    order indices. Each base point gives the rows A, AB_1 ... AB_D, BA_1 ...
+    BA_D, and B where AB_j is A with column j taken from B and BA_j is B with
+    column j taken from A.
+    """
+
+    d = problem['num_vars']
+    bounds = np.array(problem['bounds'])
+    group = 2 * d + 2
+
+    # base points per block
+    n_base = max(1, block_size // group)
+
+    sequence = qmc.Sobol(d=2 * d, scramble=False)
+    sequence.fast_forward(skip)
+
+    for i in range(0, n, n_base):
+        m = min(n_base, n - i)
+
+        # blocks are not powers of two so ignore the balance warning
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            base = sequence.random(m)
+
+        a = base[:, :d]
+        b = base[:, d:]
+
+        block = np.empty([m, group, d])
+        block[:, 0] = a
+        block[:, 1:d + 1] = a[:, None, :]
+        block[:, d + 1:2 * d + 1] = b[:, None, :]
+        block[:, -1] = b
+
+        for j in range(d):
+            block[:, 1 + j, j] = b[:, j]
+            block[:, d + 1 + j, j] = a[:, j]
+
+        # scale from the unit hypercube to the parameter bounds
+        block = bounds[:, 0] + block.reshape(-1, d) * (bounds[:, 1] - bounds[:, 0])
+
+        yield i * group, block
+
+
+class SobolAccumulator:
+    """
+    Streaming estimator of first-order and total-order Sobol indices.
+
+    Outputs for a Saltelli design are added in blocks of whole groups of
+    2 * num_vars + 2 rows. Only running sums are stored so the memory used
+    does not depend on the number of samples.
+
+    Parameters
+    ----------
+    num_vars : int
+        Number of parameters.
+    num_outputs : int
+        Number of model outputs such as gases, liquids, and solids.
+    conf_level : float, optional
+        Confidence level of the confidence intervals.
+
+    Notes
+    -----
+    The estimators are those of Saltelli 2010 used by `SALib.analyze.sobol`.
+    The confidence intervals use the normal approximation of the estimator
+    variance instead of bootstrap resampling. Second-order indices are not
+    estimated.
+    """
+
+    def __init__(self, num_vars, num_outputs, conf_level=0.95):
+        self.d = num_vars
+        self.z = norm.ppf(0.5 + conf_level / 2)
+        self.n = 0
+
+        shape = (num_vars, num_outputs)
+
+        # sums over all model outputs
+        self.sum_y = np.zeros(num_outputs)
+        self.count_y = 0
+
+        # sums over the A and B rows for the variance
+        self.sum_ab = np.zeros(num_outputs)
+        self.sum_ab2 = np.zeros(num_outputs)
+
+        # sums for the first-order estimator f = B * (AB - A) and d = AB - A
+        self.sum_f = np.zeros(shape)
+        self.sum_f2 = np.zeros(shape)
+        self.sum_fd = np.zeros(shape)
+        self.sum_d = np.zeros(shape)
+        self.sum_d2 = np.zeros(shape)
+
+        # sums for the total-order estimator g = (A - AB)^2 / 2
+        self.sum_g = np.zeros(shape)
+        self.sum_g2 = np.zeros(shape)
+
+    def add(self, y):
+        """
+        Add model outputs for whole groups of Saltelli rows.
+
+        Parameters
+        ----------
+        y : ndarray
+            Outputs with shape (rows, num_outputs) in the row order of the
+            design.
+        """
+        d = self.d
+        y = np.asarray(y, dtype=float).reshape(-1, 2 * d + 2, self.sum_y.size)
+
+        a = y[:, 0]
+        ab = y[:, 1:d + 1]
+        b = y[:, -1]
+
+        self.n += len(y)
+        self.sum_y += y.sum(axis=(0, 1))
+        self.count_y += y.shape[0] * y.shape[1]
+        self.sum_ab += a.sum(axis=0) + b.sum(axis=0)
+        self.sum_ab2 += (a**2).sum(axis=0) + (b**2).sum(axis=0)
+
+        diff = ab - a[:, None]
+        f = b[:, None] * diff
+        g = 0.5 * diff**2
+
+        self.sum_f += f.sum(axis=0)
+        self.sum_f2 += (f**2).sum(axis=0)
+        self.sum_fd += (f * diff).sum(axis=0)
+        self.sum_d += diff.sum(axis=0)
+        self.sum_d2 += (diff**2).sum(axis=0)
+        self.sum_g += g.sum(axis=0)
+        self.sum_g2 += (g**2).sum(axis=0)
+
+    def indices(self):
+        """
+        Sobol indices from the outputs added so far.
+
+        Returns
+        -------
+        list of dict
+            Indices for each output with the keys S1, S1_conf, ST, and ST_conf
+            as returned by `SALib.analyze.sobol.analyze`.
+        """
+        n = self.n
+
+        # variance of the A and B outputs
+        var = self.sum_ab2 / (2 * n) - (self.sum_ab / (2 * n))**2
+
+        # center the outputs on their overall mean as done by SALib
+        mean_y = self.sum_y / self.count_y
+        f_mean = (self.sum_f - mean_y * self.sum_d) / n
+        f2_mean = (self.sum_f2 - 2 * mean_y * self.sum_fd + mean_y**2 * self.sum_d2) / n
+        f_var = f2_mean - f_mean**2
+
+        g_mean = self.sum_g / n
+        g_var = self.sum_g2 / n - g_mean**2
+
+        s1 = f_mean / var
+        s1_conf = self.z * np.sqrt(np.maximum(f_var, 0) / n) / var
+        st = g_mean / var
+        st_conf = self.z * np.sqrt(np.maximum(g_var, 0) / n) / var
+
+        si = [
+            {'S1': s1[:, k], 'S1_conf': s1_conf[:, k], 'ST': st[:, k], 'ST_conf': st_conf[:, k]}
+            for k in range(len(var))
+        ]
+
+        return si
+
+
+class RunningStats:
+    """
+    Streaming mean and variance of several model outputs.
+
+    Outputs are added in blocks of rows and merged into the running values
+    with the parallel update of Chan et al. so only the count, mean, and sum
+    of squared deviations are stored. Rows with a NaN output are skipped.
+
+    Parameters
+    ----------
+    num_outputs : int
+        Number of model outputs such as gases, liquids, and solids.
+    """
+
+    def __init__(self, num_outputs):
+        self.n = 0
+        self.mean = np.zeros(num_outputs)
+        self.m2 = np.zeros(num_outputs)
+
+    def add(self, y):
+        """
+        Add model outputs with shape (rows, num_outputs).
+        """
+        y = np.asarray(y, dtype=float).reshape(-1, self.mean.size)
+        y = y[np.all(np.isfinite(y), axis=1)]
+
+        if len(y) == 0:
+            return
+
+        n_b = len(y)
+        mean_b = y.mean(axis=0)
+        m2_b = ((y - mean_b)**2).sum(axis=0)
+
+        n = self.n + n_b
+        delta = mean_b - self.mean
+
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta**2 * self.n * n_b / n
+        self.n = n
+
+    @property
+    def variance(self):
+        """
+        Sample variance of each output.
+        """
+        if self.n < 2:
+            return np.full(self.mean.size, np.nan)
+        return self.m2 / (self.n - 1)
+
+    def half_width(self, conf_level=0.95):
+        """
+        Half-width of the confidence interval of each mean.
+        """
+        return norm.ppf(0.5 + conf_level / 2) * np.sqrt(self.variance / self.n)
+
+
+class P2Quantile:
+    """
+    Streaming estimate of one quantile with the P² algorithm of Jain and
+    Chlamtac 1985. Five markers track the minimum, the quantile, the
+    maximum, and two points between them so no observations are stored.
+
+    Parameters
+    ----------
+    p : float
+        Probability of the quantile such as 0.5 for the median.
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.q = []
+        self.pos = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.incr = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        """
+        Add one observation.
+        """
+        q = self.q
+        pos = self.pos
+
+        # keep the first five observations as the initial markers
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        # cell of the observation and update the extreme markers
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = max(i for i in range(4) if q[i] <= x)
+
+        for i in range(k + 1, 5):
+            pos[i] += 1
+
+        for i in range(5):
+            self.desired[i] += self.incr[i]
+
+        # move the middle markers toward their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - pos[i]
+
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+
+                # piecewise parabolic prediction or linear if it is not monotonic
+                qp = q[i] + d / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + d) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - d) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1]))
+
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (pos[i + d] - pos[i])
+
+                q[i] = qp
+                pos[i] += d
+
+    @property
+    def value(self):
+        """
+        Current estimate of the quantile.
+        """
+        if not self.q:
+            return np.nan
+        if len(self.q) < 5:
+            return float(np.quantile(self.q, self.p))
+        return self.q[2]
+
+
+class QuantileAccumulator:
+    """
+    Streaming quantiles of several model outputs with a `P2Quantile` for
+    every output and probability. Rows with a NaN output are skipped.
+
+    Parameters
+    ----------
+    probs : list of float
+        Probabilities of the quantiles.
+    num_outputs : int
+        Number of model outputs such as gases, liquids, and solids.
+    """
+
+    def __init__(self, probs, num_outputs):
+        self.probs = list(probs)
+        self.estimators = [[P2Quantile(p) for p in self.probs] for _ in range(num_outputs)]
+
+    def add(self, y):
+        """
+        Add model outputs with shape (rows, num_outputs).
+        """
+        y = np.asarray(y, dtype=float).reshape(-1, len(self.estimators))
+        y = y[np.all(np.isfinite(y), axis=1)]
+
+        for row in y:
+            for x, estimators in zip(row, self.estimators):
+                for est in estimators:
+                    est.add(x)
+
+    def values(self):
+        """
+        Quantiles with shape (num_outputs, n_probs).
+        """
+        return np.array([[est.value for est in estimators] for estimators in self.estimators])
@@ -0,0 +1,146 @@
+"""
+Memory-mapped storage of batch reactor trajectories. Trajectories are stored
+as a samples × time × species float32 array in a NumPy `.npy` file with a
+sidecar `.json` index of the species names and times. Slices are read from
+disk only when they are used.
+"""
+
+import json
+import numpy as np
+
+
+def _index_path(path):
+    """
+    Path to the sidecar index for a trajectory file.
+    """
+    return path[:-4] + '.json' if path.endswith('.npy') else path + '.json'
+
+
+def create_store(path, n_samples, time, species):
+    """
+    Create a trajectory file for a number of samples.
+
+    Parameters
+    ----------
+    path : str
+        Path to the `.npy` trajectory file.
+    n_samples : int
+        Number of samples (rows) in the store.
+    time : ndarray
+        Times at which each trajectory is stored [s].
+    species : list of str
+        Names of the stored species.
+
+    Returns
+    -------
+    store : memmap
+        Writable array with shape (n_samples, len(time), len(species)).
+    """
+
+    store = np.lib.format.open_memmap(
+        path, mode='w+', dtype=np.float32, shape=(n_samples, len(time), len(species)))
+
+    index = {
+        'shape': list(store.shape),
+        'dtype': 'float32',
+        'time': [float(t) for t in time],
+        'species': list(species)
+    }
+
+    with open(_index_path(path), 'w') as f:
+        json.dump(index, f)
+
+    return store
+
+
+def open_store(path, mode='r'):
+    """
+    Open an existing trajectory file without loading it into memory.
+
+    Parameters
+    ----------
+    path : str
+        Path to the `.npy` trajectory file.
+    mode : str, optional
+        Use `r` to read or `r+` to write to the store (default: r).
+
+    Returns
+    -------
+    store : memmap
+        Array with shape (n_samples, n_times, n_species).
+    index : dict
+        Sidecar index with the `time` and `species` names.
+    """
+
+    store = np.load(path, mmap_mode=mode)
+
+    with open(_index_path(path)) as f:
+        index = json.load(f)
+
+    return store, index
+
+
+def species_trajectories(path, names, samples=slice(None)):
+    """
+    Read the trajectories of selected species.
+
+    Parameters
+    ----------
+    path : str
+        Path to the `.npy` trajectory file.
+    names : list of str
+        Species names.
+    samples : slice or array_like, optional
+        Samples to read (default: all samples).
+
+    Returns
+    -------
+    time : ndarray
+        Stored times [s].
+    y : ndarray
+        Mass fractions with shape (n_samples, n_times, len(names)).
+    """
+
+    store, index = open_store(path)
+    cols = [index['species'].index(sp) for sp in names]
+    y = np.asarray(store[samples][:, :, cols])
+
+    return np.array(index['time']), y
+
+
+def lumped_trajectories(path, groups, block_size=1000):
+    """
+    Sum the stored species into lumped groups such as gases, liquids, and
+    solids. The store is read in blocks of samples so at most one block of
+    the species trajectories is in memory at a time. The lumped arrays that
+    are returned hold every sample and time of each group.
+
+    Parameters
+    ----------
+    path : str
+        Path to the `.npy` trajectory file.
+    groups : dict
+        Lists of species names for each group name.
+    block_size : int, optional
+        Number of samples read from disk at a time.
+
+    Returns
+    -------
+    time : ndarray
+        Stored times [s].
+    lumped : dict
+        Mass fractions with shape (n_samples, n_times) for each group name.
+    """
+
+    store, index = open_store(path)
+    n_samples, n_times, _ = store.shape
+
+    cols = {g: [index['species'].index(sp) for sp in names] for g, names in groups.items()}
+    lumped = {g: np.zeros([n_samples, n_times]) for g in groups}
+
+    for start in range(0, n_samples, block_size):
+        block = np.asarray(store[start:start + block_size])
+        for g, c in cols.items():
+            lumped[g][start:start + len(block)] = block[:, :, c].sum(axis=2)
+
+    return np.array(index['time']), lumped
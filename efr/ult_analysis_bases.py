@@ -1,5 +1,7 @@
 import logging
 
+from results import UltBases
+
 
 def ult_analysis_bases(feedstock):
     """
@@ -12,7 +14,7 @@ def ult_analysis_bases(feedstock):
 
     Returns
     -------
-    ult_bases : dict
+    ult_bases : UltBases
         Ultimate analysis bases.
     """
 
@@ -49,11 +51,6 @@ def ult_analysis_bases(feedstock):
     logging.info(results)
 
     # return results
-    ult_bases = {
-        'ar': ult_ar,
-        'dry': ult_dry,
-        'daf': ult_daf,
-        'dafcho': ult_dafcho
-    }
+    ult_bases = UltBases.from_lists(ult_ar, ult_dry, ult_daf, ult_dafcho)
 
     return ult_bases
@@ -0,0 +1,248 @@
+"""
+Propagation of the measurement uncertainty of the feedstock analyses to the
+predicted gas, liquid, and solid yields. Feedstock values are drawn from
+normal distributions using a scrambled Sobol sequence and each sample runs
+the complete chain of ultimate analysis bases, biomass composition, and
+batch reactor in the worker pool. Means, variances, and quantiles of the
+yields are accumulated with streaming estimators and sampling stops once the
+confidence interval of every mean is narrow enough.
+"""
+
+import cantera as ct
+import copy
+import logging
+import math
+import numpy as np
+import os
+import warnings
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+from scipy.stats import norm
+from scipy.stats import qmc
+
+from batch_reactor import bc_to_y
+from batch_reactor import lumped_yields
+from batch_reactor import run_batch
+from biocomp import biomass_composition
+from progress import Progress
+from results import outputs
+from streaming import QuantileAccumulator
+from streaming import RunningStats
+from workers import worker_pool
+
+# feedstock entries used by each biomass composition method
+_method_fields = {
+    'chem': ('chemical_analysis',),
+    'ult': ('ultimate_analysis',),
+    'ultmod': ('biomass_characterization',)
+}
+
+
+def _uncertain_fields(feedstock, method):
+    """
+    Feedstock entries with a nonzero uncertainty that the composition method
+    uses as (field, key, value, sigma) where the key is a list index or a
+    dictionary key.
+    """
+    if method not in _method_fields:
+        raise ValueError(f'unknown biomass composition method {method!r}, use chem, ult, or ultmod')
+
+    fields = []
+
+    for field, sigma in feedstock.get('uncertainty', {}).items():
+        if field not in feedstock:
+            raise ValueError(f'uncertainty given for unknown feedstock field {field!r}')
+
+        # entries the method does not use have no effect on the yields
+        if field not in _method_fields[method]:
+            continue
+
+        items = enumerate(sigma) if isinstance(sigma, (list, tuple)) else sigma.items()
+
+        for key, s in items:
+            if s > 0:
+                fields.append((field, key, feedstock[field][key], s))
+
+    return fields
+
+
+def _sample_feedstock(feedstock, fields, z):
+    """
+    Feedstock with each uncertain entry moved by its standard normal
+    deviate. Values stay non-negative.
+    """
+    fs = copy.deepcopy(feedstock)
+
+    for (field, key, value, sigma), zi in zip(fields, z):
+        fs[field][key] = max(value + sigma * zi, 0.0)
+
+    return fs
+
+
+def _evaluate_batch(z, feedstock, fields, method, reactor):
+    """
+    Final gas, liquid, and solid yields for a batch of standard normal
+    deviates, run in a worker. Yields are NaN for samples that give a
+    negative composition or where the integrator fails.
+    """
+    y_out = np.full([len(z), 3], np.nan)
+
+    for i, zi in enumerate(z):
+        try:
+            fs = _sample_feedstock(feedstock, fields, zi)
+            y = bc_to_y(biomass_composition(fs, method, plot=False))
+            if min(y.values()) < 0:
+                continue
+            states, _ = run_batch(y, reactor)
+        except (ct.CanteraError, ValueError):
+            continue
+
+        y_gases, y_liquids, y_solids = lumped_yields(states)
+        y_out[i] = y_gases[-1], y_liquids[-1], y_solids[-1]
+
+    return y_out
+
+
+def propagate_uncertainty(feedstock, reactor, uncertainty, n_workers=None):
+    """
+    Propagate the feedstock measurement uncertainty to the final yields of
+    the batch reactor.
+
+    Parameters
+    ----------
+    feedstock : dict
+        Feedstock parameters with the standard deviation of the uncertain
+        entries in `uncertainty`.
+    reactor : dict
+        Reactor parameters.
+    uncertainty : dict
+        Uncertainty propagation parameters.
+    n_workers : int, optional
+        Number of worker processes. Default is the number of CPUs.
+
+    Returns
+    -------
+    result : dict
+        Number of samples and failed samples, whether the confidence
+        intervals converged, and the mean, standard deviation, confidence
+        interval half-width, and quantiles of each yield.
+
+    Notes
+    -----
+    The confidence intervals treat the quasi-Monte Carlo samples as random
+    samples. Scrambled Sobol points converge faster than that so the
+    intervals are conservative.
+    """
+
+    method = uncertainty['method']
+    batch_size = uncertainty['batch_size']
+    max_samples = uncertainty['max_samples']
+    conf_level = uncertainty['conf_level']
+
+    fields = _uncertain_fields(feedstock, method)
+
+    if not fields:
+        raise ValueError(
+            f'feedstock has no uncertain entries used by the {method} method, set the standard deviations of '
+            f'{" or ".join(_method_fields[method])} in its `uncertainty`')
+
+    sampler = qmc.Sobol(d=len(fields), scramble=True, seed=uncertainty['seed'])
+    stats = RunningStats(3)
+    quantiles = QuantileAccumulator(uncertainty['quantiles'], 3)
+
+    def batches():
+        for start in range(0, max_samples, batch_size):
+            # batches are not powers of two so ignore the balance warning
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                u = sampler.random(min(batch_size, max_samples - start))
+            yield norm.ppf(np.clip(u, 1e-12, 1 - 1e-12))
+
+    def converged():
+        return stats.n >= uncertainty['min_samples'] and np.all(stats.half_width(conf_level) <= uncertainty['tol'])
+
+    n_workers = n_workers or os.cpu_count()
+    progress = Progress(max_samples, 'Uncertainty samples')
+    n_samples = 0
+
+    def add(y_out):
+        nonlocal n_samples
+        stats.add(y_out)
+        quantiles.add(y_out)
+        n_samples += len(y_out)
+
+        # the half-width shrinks as one over the square root of the samples
+        # so the progress total is the number of samples expected to
+        # converge, including failed samples at the rate seen so far
+        if stats.n > 1:
+            needed = n_samples * np.max(stats.half_width(conf_level) / uncertainty['tol'])**2
+            expected = max(needed, uncertainty['min_samples'], n_samples)
+            progress.total = min(max_samples, math.ceil(expected))
+
+        progress.update(len(y_out))
+
+    with worker_pool(n_workers) as pool:
+        pending = set()
+
+        # at most two batches per worker are queued so sampling stops soon
+        # after the intervals converge
+        for z in batches():
+            pending.add(pool.submit(_evaluate_batch, z, feedstock, fields, method, reactor))
+
+            if len(pending) < 2 * n_workers:
+                continue
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for f in finished:
+                add(f.result())
+
+            if converged():
+                break
+
+        if converged():
+            for f in pending:
+                f.cancel()
+        else:
+            for f in wait(pending).done:
+                add(f.result())
+
+    # the final report shows the samples that were actually evaluated
+    if progress.total != n_samples:
+        progress.total = n_samples
+        progress.report()
+
+    mean = stats.mean
+    std = np.sqrt(stats.variance)
+    conf = stats.half_width(conf_level)
+    qs = quantiles.values()
+    probs = uncertainty['quantiles']
+
+    # log results to console
+    results = (
+        f'{" Uncertainty of batch reactor yields ":-^80}\n\n'
+        f'method      = {method}\n'
+        f'uncertain   = {", ".join(f"{f}[{k}]" for f, k, _, _ in fields)}\n'
+        f'samples     = {n_samples:,} ({n_samples - stats.n:,} failed)\n'
+        f'converged   = {converged()} (±{uncertainty["tol"] * 100:.2f} % at {conf_level:.0%} confidence)\n\n'
+        f'{"% mass":10} {"mean":>8} {"std":>8} {"± conf":>8} ' + ' '.join(f'{f"q{p:g}":>8}' for p in probs)
+    )
+    logging.info(results)
+
+    for k, name in enumerate(outputs):
+        row = ' '.join(f'{q * 100:8.2f}' for q in qs[k])
+        logging.info(f'{name:10} {mean[k] * 100:8.2f} {std[k] * 100:8.2f} {conf[k] * 100:8.3f} {row}')
+
+    result = {
+        'method': method,
+        'samples': n_samples,
+        'failed': n_samples - stats.n,
+        'converged': bool(converged()),
+        'mean': dict(zip(outputs, mean)),
+        'std': dict(zip(outputs, std)),
+        'conf': dict(zip(outputs, conf)),
+        'quantiles': {p: dict(zip(outputs, qs[:, j])) for j, p in enumerate(probs)}
+    }
+
+    return result
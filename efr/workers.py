@@ -0,0 +1,69 @@
+"""
+Process pool for running batch reactors in parallel. Each worker loads the
+Debiagi 2018 mechanism once when it starts and keeps it for every task.
+"""
+
+import logging
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+from mechanism import load_gas
+
+
+def _init_worker():
+    """
+    Initialize a worker process.
+    """
+
+    # results are logged by the parent process, workers only report warnings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # parse the mechanism before the first task arrives
+    load_gas()
+
+
+def _ping():
+    """
+    Task that returns once the worker has been initialized.
+    """
+    return os.getpid()
+
+
+def worker_pool(n_workers=None):
+    """
+    Create a pool of worker processes with the mechanism loaded.
+
+    Parameters
+    ----------
+    n_workers : int, optional
+        Number of worker processes. Default is the number of CPUs.
+
+    Returns
+    -------
+    pool : ProcessPoolExecutor
+        Pool of worker processes.
+    """
+
+    n_workers = n_workers or os.cpu_count()
+    pool = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker)
+
+    return pool
+
+
+def warm_up(pool, n_workers=None):
+    """
+    Start every worker in the pool and wait until each one has loaded the
+    mechanism.
+
+    Parameters
+    ----------
+    pool : ProcessPoolExecutor
+        Pool of worker processes.
+    n_workers : int, optional
+        Number of worker processes in the pool. Default is the number of CPUs.
+    """
+    n_workers = n_workers or os.cpu_count()
+    futures = [pool.submit(_ping) for _ in range(n_workers)]
+    for f in futures:
+        f.result()
@@ -8,6 +8,13 @@ chemical_analysis : dict
     Biomass composition determined from chemical analysis data. These values
     are used for the pyrolysis kinetics. Values are given as mass fraction (-)
     on dry ash-free basis (% daf).
+
+uncertainty : dict
+    Standard deviation of the measurement of each entry in the same units and
+    layout as the `ultimate_analysis`, `chemical_analysis`, and
+    `biomass_characterization` entries. Entries with zero or no standard
+    deviation are held fixed. Used by the uncertainty propagation, which only
+    samples the entries of the analysis its composition method uses.
 """
 
 feedstock = {
@@ -33,6 +40,18 @@ feedstock = {
         'gamma': 0.6,
         'delta': 0.78,
         'epsilon': 0.88
+    },
+
+    'uncertainty': {
+        'ultimate_analysis': [0.5, 0.1, 0.5, 0.02, 0.01, 0.05, 0.2],
+        'chemical_analysis': {
+            'cellulose': 1.0,
+            'hemicellulose': 1.0,
+            'lignin_c': 0.5,
+            'lignin_h': 0.5,
+            'lignin_o': 0.5,
+            'tannins': 0.5
+        }
     }
 }
 
@@ -43,6 +62,32 @@ energy : str
     Used by the Cantera reactor model. If set to `off` then disable the energy
     equation. If `on` then enable the energy and use the provided thermo data
     for the reactions.
+
+rtol, atol : float
+    Relative and absolute tolerances of the Cantera reactor integrator.
+
+max_steps : int
+    Maximum number of integrator steps before giving up.
+
+max_time_step : float or None
+    Maximum integrator time step [s]. Use `None` for no limit.
+
+output : str
+    States recorded by the reactor. Use `fixed` for 100 evenly spaced times,
+    `steps` for every integrator step, or `adaptive` for the integrator steps
+    where a mass fraction changed by at least `output_tol` since the last
+    recorded state. Stepping outputs avoid restarting the integrator at each
+    time and can be interpolated to other times afterwards.
+
+profile : dict or None
+    Particle temperature history T(t) that replaces the fixed temperature and
+    energy equation. Use `None` for a fixed initial temperature. A `table`
+    profile interpolates its `time` [s] and `temperature` [K] lists. A
+    `heating_rate` profile heats from the `initial` temperature [K] at a
+    constant `rate` [K/s] up to the reactor temperature then holds. Optional
+    keys are `substeps` (least segments per output interval), `max_dT`
+    (largest temperature change over a segment [K]), and `resolution`
+    (rounding of segment temperatures [K] so cached propagators are reused).
 """
 
 reactor = {
@@ -50,11 +95,29 @@ reactor = {
     'pressure': 101_325.0,
     'temperature': 773.15,
     'time_duration': 10.0,
-    'energy': 'on'
+    'energy': 'on',
+    'rtol': 1e-9,
+    'atol': 1e-15,
+    'max_steps': 20_000,
+    'max_time_step': None,
+    'output': 'fixed',
+    'output_tol': 1e-3,
+    'profile': None
 }
 
 """
 Sensitivity analysis parameters for the Debiagi 2018 kinetics.
+
+trajectories : str or None
+    Path to a `.npy` file for storing the species mass fractions of every
+    sample at every time as a memory-mapped array. Use `None` to only keep the
+    final gas, liquid, and solid yields.
+
+block_size : int or None
+    Generate and evaluate the samples in blocks of about this many rows and
+    estimate the Sobol indices from running sums so memory does not grow with
+    the number of samples. Use `None` to generate the complete sample matrix
+    and analyze it with SALib.
 """
 
 sensitivity_analysis = {
@@ -67,5 +130,150 @@ sensitivity_analysis = {
                [0.01, 0.99],
                [0.01, 0.99],
                [0.01, 0.99],
-               [0.01, 0.99]]
+               [0.01, 0.99]],
+    'trajectories': None,
+    'block_size': None
+}
+
+"""
+Reference panel for checking kinetics engines against the Cantera batch
+reactor. The panel uses the Blend3 chem, ult, and ultmod compositions plus
+random rows of a Saltelli design at each temperature and energy setting.
+
+species_atol, phase_atol : float or dict
+    Largest allowed difference in mass fraction of each species and of the
+    gas, liquid, and solid yields at every time. A dictionary gives the
+    tolerance of each species or phase by name with a `default` for the
+    others.
+"""
+
+golden = {
+    'n_random': 8,
+    'temperatures': [673.15, 773.15, 873.15],
+    'energy': ['on', 'off'],
+    'species_atol': {'default': 1e-4},
+    'phase_atol': {'default': 1e-3, 'gases': 2e-3}
+}
+
+"""
+Fitting of the characterization splitting parameters or the kinetics to
+measured yields. The measured yields below are the Case 3 batch reactor
+results from the report and should be replaced with experimental data.
+
+method : str
+    Use `biocomp` to fit the `biomass_characterization` parameters in
+    `names` for the `ultmod` method. Use `kinetics` to fit the log10
+    multipliers of the pre-exponential factors of the reaction indices in
+    `reactions` for the composition given by the `composition` method.
+
+measured, weights : dict
+    Measured final gas, liquid, and solid (char and metaplastics) mass
+    fractions and the weight of each in the squared error.
+
+n_starts : int
+    Number of optimizations started from a Latin hypercube design.
+
+max_iter : int
+    Maximum iterations of each optimization.
+
+fd_step : float
+    Finite-difference step as a fraction of the width of each bound.
+
+output : str or None
+    Path to a JSON file for the fitted parameters and yields. Use `None` to
+    only log the results.
+"""
+
+fitting = {
+    'method': 'biocomp',
+    'composition': 'chem',
+    'measured': {'gases': 0.1499, 'liquids': 0.5251, 'solids': 0.3251},
+    'weights': {'gases': 1.0, 'liquids': 1.0, 'solids': 1.0},
+    'biocomp': {
+        'names': ['alpha', 'beta', 'gamma', 'delta', 'epsilon'],
+        'bounds': [[0.4, 0.8], [0.4, 1.0], [0.4, 1.0], [0.6, 1.0], [0.6, 1.0]]
+    },
+    'kinetics': {
+        'reactions': [0, 1, 2, 3],
+        'bounds': [[-1.0, 1.0], [-1.0, 1.0], [-1.0, 1.0], [-1.0, 1.0]]
+    },
+    'n_starts': 4,
+    'max_iter': 30,
+    'fd_step': 1e-3,
+    'seed': 0,
+    'output': 'fit-results.json'
+}
+
+"""
+Emulator of the lumped gas, liquid, and solid yields trained from batch
+reactor runs over the composition, temperature, and residence time.
+
+n_train, n_validation : int
+    Number of training and held-out validation runs from a scrambled Sobol
+    design. Powers of two keep the design balanced.
+
+names, bounds : list
+    Reactor species of the composition and the bounds of each before the
+    composition is normalized to mass fractions.
+
+temperatures, time : list
+    Temperature range [K] and residence time range [s] of the emulator. The
+    residence times of each run are `n_times` points spaced evenly in log
+    time.
+
+degree, ridge : int, float
+    Degree of the polynomial features and the ridge penalty.
+
+cache_dir : str
+    Directory of the cached training runs.
+"""
+
+emulator = {
+    'n_train': 256,
+    'n_validation': 64,
+    'names': ['CELL', 'GMSW', 'LIGC', 'LIGH', 'LIGO', 'TANN', 'TGL'],
+    'bounds': [[0.01, 0.99],
+               [0.01, 0.99],
+               [0.01, 0.99],
+               [0.01, 0.99],
+               [0.01, 0.99],
+               [0.01, 0.99],
+               [0.01, 0.99]],
+    'temperatures': [673.15, 873.15],
+    'time': [1e-3, 10.0],
+    'n_times': 50,
+    'degree': 3,
+    'ridge': 1e-6,
+    'cache_dir': '.efr-cache/emulator',
+    'seed': 0
+}
+
+"""
+Propagation of the feedstock measurement uncertainty in the `uncertainty`
+entry of the feedstock parameters to the final batch reactor yields.
+
+method : str
+    Biomass composition method as `chem`, `ult`, or `ultmod`.
+
+batch_size : int
+    Number of samples evaluated by a worker as one task.
+
+min_samples, max_samples : int
+    Sampling stops once at least `min_samples` have been evaluated and the
+    confidence interval of every mean yield is within `tol` (mass fraction)
+    at the `conf_level`, or when `max_samples` have been evaluated.
+
+quantiles : list of float
+    Probabilities of the yield quantiles to estimate.
+"""
+
+uncertainty = {
+    'method': 'chem',
+    'batch_size': 32,
+    'min_samples': 128,
+    'max_samples': 4096,
+    'tol': 0.002,
+    'conf_level': 0.95,
+    'quantiles': [0.05, 0.5, 0.95],
+    'seed': 0
 }
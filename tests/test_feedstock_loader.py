@@ -0,0 +1,79 @@
+import os
+import shutil
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'efr'))
+
+from feedstock_loader import load_feedstock  # noqa: E402
+
+_data = os.path.join(os.path.dirname(__file__), '..', 'data', 'blend3-feedstock.xlsx')
+
+_main = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_rel = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+
+def _workbook(path, cells):
+    """
+    Minimal workbook with one sheet `Data` of cell XML fragments by reference.
+    """
+    rows = ''.join(f'<c r="{ref}"{xml}</c>' for ref, xml in cells.items())
+    parts = {
+        'xl/workbook.xml': (
+            f'<workbook xmlns="{_main}" xmlns:r="{_rel}"><sheets><sheet name="Data" sheetId="1" r:id="rId1"/>'
+            f'</sheets><definedNames><definedName name="first">Data!$A$1</definedName></definedNames></workbook>'),
+        'xl/_rels/workbook.xml.rels': (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{_rel}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{_rel}/sharedStrings" Target="sharedStrings.xml"/></Relationships>'),
+        'xl/sharedStrings.xml': f'<sst xmlns="{_main}"><si><t>2.5</t></si><si><t>n/a</t></si></sst>',
+        'xl/worksheets/sheet1.xml': f'<worksheet xmlns="{_main}"><sheetData><row r="1">{rows}</row></sheetData></worksheet>'
+    }
+    with zipfile.ZipFile(path, 'w') as z:
+        for name, xml in parts.items():
+            z.writestr(name, xml)
+
+
+def test_blend3_workbook(tmp_path):
+    path = shutil.copy(_data, tmp_path / 'blend3.xlsx')
+    fs = load_feedstock(str(path), name='Blend3')
+
+    assert fs['name'] == 'Blend3'
+    assert fs['ultimate_analysis'] == pytest.approx([49.52, 5.28, 38.35, 0.15, 0.02, 0.64, 6.04])
+    assert fs['chemical_analysis']['cellulose'] == pytest.approx(39.19, abs=0.01)
+
+    # cached values are used while the workbook is unchanged
+    assert load_feedstock(str(path), name='Blend3') == fs
+    assert os.path.exists(tmp_path / '.feedstock-cache' / 'blend3.npz')
+
+
+def test_cell_types(tmp_path):
+    path = str(tmp_path / 'cells.xlsx')
+    _workbook(path, {
+        'A1': '><v>1.5</v>',
+        'B1': ' t="s"><v>0</v>',
+        'C1': ' t="inlineStr"><is><t>3.5</t></is>',
+        'D1': ' t="str"><v>4</v>'
+    })
+    layout = {'x': ['first', 'Data!B1', 'Data!C1', 'Data!D1', 'Data!E1']}
+
+    x = load_feedstock(path, layout)['x']
+
+    assert x[:4] == [1.5, 2.5, 3.5, 4.0]
+    assert np.isnan(x[4])
+
+
+@pytest.mark.parametrize('xml, message', [
+    (' t="e"><v>#DIV/0!</v>', 'error #DIV/0!'),
+    (' t="s"><v>1</v>', "'n/a'"),
+    (' t="b"><v>1</v>', 'not numeric')
+])
+def test_non_numeric_cells(tmp_path, xml, message):
+    path = str(tmp_path / 'cells.xlsx')
+    _workbook(path, {'A1': xml})
+
+    with pytest.raises(ValueError, match=message):
+        load_feedstock(path, {'x': ['Data!A1']})
@@ -0,0 +1,78 @@
+import os
+import sys
+
+from argparse import Namespace
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('cantera')
+pytest.importorskip('matplotlib')
+
+efr_dir = os.path.join(os.path.dirname(__file__), '..', 'efr')
+sys.path.insert(0, efr_dir)
+
+from pipeline import _source_files  # noqa: E402
+from pipeline import _stage_keys  # noqa: E402
+from pipeline import _stages  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def repo_dir(monkeypatch):
+    # the kinetics file is relative to the repository
+    monkeypatch.chdir(os.path.join(efr_dir, '..'))
+
+
+def _params(**reactor):
+    return SimpleNamespace(
+        feedstock={'name': 'test', 'ultimate_analysis': [50, 6, 43, 0.5, 0, 0.5, 0]},
+        reactor=dict({'temperature': 773.15, 'pressure': 101325.0, 'time_duration': 10.0}, **reactor),
+        sensitivity_analysis={'n_samples': 8}
+    )
+
+
+def _keys(biocomp='chem', sensitivity=False, **reactor):
+    args = Namespace(biocomp=biocomp, sensitivity_analysis=sensitivity, workers=None)
+    return _stage_keys(_stages(args, _params(**reactor)))
+
+
+def test_source_files():
+    paths = _source_files(['compare'])
+    files = [os.path.basename(f) for f in paths]
+
+    # modules imported directly and through other modules
+    assert 'compare.py' in files
+    assert 'batch_reactor.py' in files
+    assert 'mechanism.py' in files
+
+    # modules outside the EFR source directory and modules not imported
+    assert 'pipeline.py' not in files
+    assert 'numpy.py' not in files
+
+    # fixed order so the hash of the files is stable
+    assert paths == sorted(paths)
+
+
+def test_stage_keys_are_stable():
+    assert _keys() == _keys()
+
+
+def test_stage_keys_follow_inputs():
+    keys = _keys()
+    hot = _keys(temperature=873.15)
+    ult = _keys(biocomp='ult')
+
+    # a reactor input only changes the batch stage
+    assert hot['ult_bases'] == keys['ult_bases']
+    assert hot['biocomp'] == keys['biocomp']
+    assert hot['batch'] != keys['batch']
+
+    # a changed upstream stage changes the keys of its downstream stages
+    assert ult['ult_bases'] == keys['ult_bases']
+    assert ult['biocomp'] != keys['biocomp']
+    assert ult['batch'] != keys['batch']
+
+
+def test_stages_for_options():
+    assert list(_keys(biocomp='compare')) == ['ult_bases', 'compare']
+    assert 'sensitivity' in _keys(sensitivity=True)
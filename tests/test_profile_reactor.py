@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cantera')
+
+from scipy.integrate import solve_ivp  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'efr'))
+
+from batch_reactor import time_grid  # noqa: E402
+from profile_reactor import rate_matrix  # noqa: E402
+from profile_reactor import run_profile  # noqa: E402
+from profile_reactor import segments  # noqa: E402
+from profile_reactor import temperature_profile  # noqa: E402
+
+
+@pytest.fixture
+def reactor():
+    # steep ramp that ends inside the first output interval
+    profile = {'type': 'heating_rate', 'initial': 298.15, 'rate': 2e4}
+    return {
+        'pressure': 101_325.0, 'temperature': 773.15, 'time_duration': 2.0, 'energy': 'off',
+        'output': 'fixed', 'profile': profile
+    }
+
+
+def test_segments_limit_temperature_change(reactor):
+    profile = reactor['profile']
+    time = time_grid(reactor)
+
+    for t0, t1 in zip(time[:-1], time[1:]):
+        edges, temps = segments(profile, reactor, t0, t1, substeps=10, max_dt=5.0)
+        change = np.abs(np.diff(temperature_profile(profile, reactor, edges)))
+        assert edges[0] == t0 and edges[-1] == t1
+        assert len(temps) >= 10
+        assert change.max() <= 5.0 + 1e-9
+
+
+def test_ramp_matches_fine_reference(reactor):
+    y = {'CELL': 0.4, 'GMSW': 0.3, 'LIGC': 0.3}
+    states, _ = run_profile(y, reactor, time_grid(reactor))
+
+    def rhs(t, yk):
+        return rate_matrix(float(temperature_profile(reactor['profile'], reactor, t))) @ yk
+
+    ref = solve_ivp(
+        rhs, (states.t[0], states.t[-1]), states.Y[0], method='LSODA', t_eval=states.t, rtol=1e-8,
+        atol=1e-12, max_step=1e-3)
+
+    assert ref.success
+    np.testing.assert_allclose(states.Y, ref.y.T, atol=2e-3)
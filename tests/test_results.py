@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'efr'))
+
+from results import Composition  # noqa: E402
+from results import components  # noqa: E402
+
+
+@pytest.fixture
+def comp():
+    return Composition('chem', np.array([39.19, 23.26, 9.89, 9.89, 9.89, 7.88, 0.0]))
+
+
+def test_composition_contains(comp):
+    assert 'cellulose' in comp
+    assert 'x' not in comp
+
+
+def test_composition_get(comp):
+    assert comp.get('cellulose') == pytest.approx(39.19)
+    assert comp.get('x') is None
+    assert comp.get('x', 0.0) == 0.0
+
+
+def test_composition_missing_key(comp):
+    with pytest.raises(KeyError):
+        comp['x']
+
+
+def test_composition_keys_values_items(comp):
+    assert list(comp.keys()) == list(components)
+    assert list(comp.values()) == pytest.approx(comp.data.tolist())
+    assert dict(comp.items()) == dict(zip(components, comp.data.tolist()))
+
+
+def test_composition_fractions(comp):
+    assert comp.fractions.sum() == pytest.approx(1.0)
@@ -0,0 +1,55 @@
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'efr'))
+
+from shared_buffer import attach_buffer  # noqa: E402
+from shared_buffer import create_buffer  # noqa: E402
+from shared_buffer import release_buffer  # noqa: E402
+
+
+def _write_row(path, row):
+    out = attach_buffer(path)
+    out[row] = row
+    out.flush()
+
+
+def test_create_buffer():
+    buffer, path = create_buffer((4, 3))
+
+    try:
+        assert buffer.shape == (4, 3)
+        assert buffer.dtype == np.float64
+        assert np.all(np.isnan(buffer))
+        assert os.path.exists(path)
+    finally:
+        release_buffer(path)
+
+
+def test_workers_write_rows():
+    buffer, path = create_buffer((4, 3))
+
+    try:
+        with ProcessPoolExecutor(2) as pool:
+            list(pool.map(_write_row, [path] * 3, [0, 2, 3]))
+
+        # rows written by the workers are seen by the parent without copies
+        np.testing.assert_array_equal(buffer[[0, 2, 3]], [[0] * 3, [2] * 3, [3] * 3])
+        assert np.all(np.isnan(buffer[1]))
+    finally:
+        release_buffer(path)
+
+
+def test_release_buffer():
+    buffer, path = create_buffer((2,), dtype=np.int32, fill=7)
+    release_buffer(path)
+
+    assert not os.path.exists(path)
+    np.testing.assert_array_equal(buffer, [7, 7])
+
+    # releasing twice is harmless
+    release_buffer(path)
@@ -0,0 +1,146 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'efr'))
+
+from streaming import P2Quantile  # noqa: E402
+from streaming import QuantileAccumulator  # noqa: E402
+from streaming import RunningStats  # noqa: E402
+from streaming import SobolAccumulator  # noqa: E402
+from streaming import saltelli_blocks  # noqa: E402
+
+problem = {
+    'num_vars': 3,
+    'names': ['x1', 'x2', 'x3'],
+    'bounds': [[-np.pi, np.pi], [-np.pi, np.pi], [-np.pi, np.pi]]
+}
+
+
+def ishigami(x):
+    return np.sin(x[:, 0]) + 7 * np.sin(x[:, 1])**2 + 0.1 * x[:, 2]**4 * np.sin(x[:, 0])
+
+
+def test_saltelli_blocks_layout():
+    d = problem['num_vars']
+    group = 2 * d + 2
+    blocks = list(saltelli_blocks(problem, 20, 50))
+
+    # blocks hold whole groups and start where the previous block ended
+    starts = [start for start, _ in blocks]
+    sizes = [len(block) for _, block in blocks]
+    assert all(size % group == 0 for size in sizes)
+    assert starts == list(np.cumsum([0] + sizes[:-1]))
+    assert sum(sizes) == 20 * group
+
+    x = np.concatenate([block for _, block in blocks]).reshape(-1, group, d)
+    a, b = x[:, 0], x[:, -1]
+
+    for j in range(d):
+        ab = a.copy()
+        ab[:, j] = b[:, j]
+        ba = b.copy()
+        ba[:, j] = a[:, j]
+        np.testing.assert_array_equal(x[:, 1 + j], ab)
+        np.testing.assert_array_equal(x[:, d + 1 + j], ba)
+
+    bounds = np.array(problem['bounds'])
+    assert np.all(x >= bounds[:, 0]) and np.all(x <= bounds[:, 1])
+
+
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+def test_saltelli_blocks_match_salib():
+    saltelli = pytest.importorskip('SALib.sample.saltelli')
+    x = saltelli.sample(problem, 64, calc_second_order=True, skip_values=1024)
+    blocks = np.concatenate([block for _, block in saltelli_blocks(problem, 64, 40)])
+
+    np.testing.assert_allclose(blocks, x)
+
+
+def test_sobol_accumulator_matches_salib():
+    sobol = pytest.importorskip('SALib.analyze.sobol')
+    x = np.concatenate([block for _, block in saltelli_blocks(problem, 256, 10**6)])
+    y = ishigami(x)
+    si = sobol.analyze(problem, y, calc_second_order=True, seed=1)
+
+    acc = SobolAccumulator(problem['num_vars'], 1)
+    for _, block in saltelli_blocks(problem, 256, 100):
+        acc.add(ishigami(block)[:, None])
+    result = acc.indices()[0]
+
+    np.testing.assert_allclose(result['S1'], si['S1'], rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(result['ST'], si['ST'], rtol=1e-9, atol=1e-12)
+
+    # normal approximation against bootstrap intervals
+    np.testing.assert_allclose(result['S1_conf'], si['S1_conf'], rtol=0.5)
+    np.testing.assert_allclose(result['ST_conf'], si['ST_conf'], rtol=0.5)
+
+
+def test_sobol_accumulator_blocks():
+    x = np.concatenate([block for _, block in saltelli_blocks(problem, 32, 10**6)])
+    y = np.column_stack([ishigami(x), x.sum(axis=1)])
+
+    whole = SobolAccumulator(problem['num_vars'], 2)
+    whole.add(y)
+
+    parts = SobolAccumulator(problem['num_vars'], 2)
+    for rows in np.array_split(y.reshape(32, -1, 2), 5):
+        parts.add(rows.reshape(-1, 2))
+
+    for si_whole, si_parts in zip(whole.indices(), parts.indices()):
+        for key in ('S1', 'S1_conf', 'ST', 'ST_conf'):
+            np.testing.assert_allclose(si_parts[key], si_whole[key], rtol=1e-10)
+
+
+def test_running_stats():
+    y = np.random.default_rng(0).normal(size=(1000, 3)) * [1, 2, 3] + [0.1, 0.2, 0.3]
+    y[[5, 500]] = np.nan
+
+    stats = RunningStats(3)
+    for rows in np.array_split(y, 7):
+        stats.add(rows)
+
+    finite = y[np.all(np.isfinite(y), axis=1)]
+    assert stats.n == len(finite)
+    np.testing.assert_allclose(stats.mean, finite.mean(axis=0))
+    np.testing.assert_allclose(stats.variance, finite.var(axis=0, ddof=1))
+    np.testing.assert_allclose(stats.half_width(), 1.959964 * finite.std(axis=0, ddof=1) / np.sqrt(len(finite)))
+
+
+def test_running_stats_one_row():
+    stats = RunningStats(2)
+    stats.add([[1.0, 2.0]])
+
+    assert np.all(np.isnan(stats.variance))
+
+
+@pytest.mark.parametrize('p', [0.05, 0.5, 0.95])
+def test_p2_quantile(p):
+    x = np.random.default_rng(1).lognormal(size=20000)
+    est = P2Quantile(p)
+    for v in x:
+        est.add(v)
+
+    assert est.value == pytest.approx(np.quantile(x, p), rel=0.02)
+
+
+def test_p2_quantile_few_values():
+    est = P2Quantile(0.5)
+    assert np.isnan(est.value)
+
+    for v in [3.0, 1.0, 2.0]:
+        est.add(v)
+    assert est.value == 2.0
+
+
+def test_quantile_accumulator():
+    y = np.random.default_rng(2).normal(size=(5000, 2))
+    y[10, 1] = np.nan
+
+    acc = QuantileAccumulator([0.25, 0.75], 2)
+    acc.add(y)
+
+    finite = y[np.all(np.isfinite(y), axis=1)]
+    np.testing.assert_allclose(acc.values(), np.quantile(finite, [0.25, 0.75], axis=0).T, atol=0.05)
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'efr'))
+
+from trajectory_store import create_store  # noqa: E402
+from trajectory_store import lumped_trajectories  # noqa: E402
+from trajectory_store import open_store  # noqa: E402
+from trajectory_store import species_trajectories  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / 'traj.npy')
+    time = np.linspace(0, 1, 5)
+    species = ['A', 'B', 'C']
+    y = np.random.default_rng(0).random((7, len(time), len(species))).astype(np.float32)
+
+    out = create_store(path, len(y), time, species)
+    out[:] = y
+    out.flush()
+    del out
+
+    return path, time, species, y
+
+
+def test_open_store(store):
+    path, time, species, y = store
+    stored, index = open_store(path)
+
+    assert stored.shape == y.shape
+    assert index['species'] == species
+    np.testing.assert_allclose(index['time'], time)
+    np.testing.assert_array_equal(stored, y)
+
+
+def test_write_rows(store):
+    path, _, _, y = store
+
+    stored, _ = open_store(path, mode='r+')
+    stored[2] = 0.5
+    stored.flush()
+    del stored
+
+    stored, _ = open_store(path)
+    assert np.all(stored[2] == 0.5)
+    np.testing.assert_array_equal(stored[3], y[3])
+
+
+def test_species_trajectories(store):
+    path, time, _, y = store
+    t, sel = species_trajectories(path, ['C', 'A'], samples=slice(1, 4))
+
+    np.testing.assert_allclose(t, time)
+    np.testing.assert_array_equal(sel, y[1:4][:, :, [2, 0]])
+
+
+def test_lumped_trajectories(store):
+    path, _, _, y = store
+    _, lumped = lumped_trajectories(path, {'ab': ['A', 'B'], 'c': ['C']}, block_size=3)
+
+    np.testing.assert_allclose(lumped['ab'], y[:, :, :2].sum(axis=2), rtol=1e-6)
+    np.testing.assert_allclose(lumped['c'], y[:, :, 2], rtol=1e-6)